@@ -0,0 +1,112 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+# Attribute on the Django request holding the (raw token, AccessToken) pair
+REQUEST_TOKEN_ATTRIBUTE = "_verified_access_token"
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of access tokens whose signature and claims were already verified.
+    Entries are evicted once the token expires.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(raw_token):
+        return hashlib.sha256(raw_token.encode()).digest()
+
+    def get(self, raw_token):
+        key = self._key(raw_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            token, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, raw_token, token):
+        key = self._key(raw_token)
+        with self._lock:
+            self._entries[key] = (token, token["exp"])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_token_cache = VerifiedTokenCache(settings.VERIFIED_TOKEN_CACHE_SIZE)
+
+
+def decode_access_token(raw_token):
+    """
+    Return a validated AccessToken, skipping signature verification for tokens
+    this worker has verified recently. Raises TokenError if the token is invalid.
+    """
+    if isinstance(raw_token, bytes):
+        raw_token = raw_token.decode()
+
+    token = verified_token_cache.get(raw_token)
+    if token is None:
+        token = AccessToken(raw_token)
+        verified_token_cache.set(raw_token, token)
+    return token
+
+
+def get_request_access_token(request, raw_token):
+    """
+    Decode the access token at most once per request. The middleware and the DRF
+    authentication class both go through here and share the result.
+    """
+    if isinstance(raw_token, bytes):
+        raw_token = raw_token.decode()
+
+    verified = getattr(request, REQUEST_TOKEN_ATTRIBUTE, None)
+    if verified is not None and verified[0] == raw_token:
+        return verified[1]
+
+    token = decode_access_token(raw_token)
+    setattr(request, REQUEST_TOKEN_ATTRIBUTE, (raw_token, token))
+    return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that reuses the token already decoded by BlacklistMiddleware.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        try:
+            validated_token = get_request_access_token(request._request, raw_token)
+        except TokenError as e:
+            raise InvalidToken({"detail": str(e)})
+
+        return self.get_user(validated_token), validated_token
@@ -1,13 +1,30 @@
 from django.core.management.base import BaseCommand
 
-from apps.common.models import BlacklistedToken
+from apps.common.revocation import purge_expired_tokens
 
 
-# Create a celery beat task to remove expired blacklisted tokens once in a while
-# Perhaps once a month
+# The same purge runs from celery beat, see apps.common.tasks.purge_expired_tokens
 class Command(BaseCommand):
-    help = "Remove expired blacklisted tokens"
+    help = "Remove expired blacklisted and outstanding tokens in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Maximum number of rows deleted per statement",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.1,
+            help="Seconds to pause between batches",
+        )
 
     def handle(self, *args, **kwargs):
-        BlacklistedToken.objects.all().delete()
-        self.stdout.write("Expired blacklisted tokens removed.")
+        deleted = purge_expired_tokens(
+            batch_size=kwargs["batch_size"], sleep_seconds=kwargs["sleep"]
+        )
+        for table, count in deleted.items():
+            self.stdout.write(f"Removed {count} expired rows from {table}.")
+        self.stdout.write(self.style.SUCCESS("Expired tokens removed."))
@@ -1,9 +1,9 @@
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 from rest_framework import status
-from rest_framework_simplejwt.tokens import AccessToken
 
-from apps.common.models import BlacklistedToken
+from apps.common.authentication import get_request_access_token
+from apps.common.revocation import revocation_store, session_epoch_store
 
 
 class BlacklistMiddleware(MiddlewareMixin):
@@ -14,11 +14,14 @@ class BlacklistMiddleware(MiddlewareMixin):
             if token:
                 # Extract the token part
                 token = token.split(" ")[1]
-                access_token = AccessToken(token)
+                access_token = get_request_access_token(request, token)
                 jti = access_token["jti"]
 
-                # Check if the token's jti is in the blacklist
-                if BlacklistedToken.objects.filter(jti=jti).exists():
+                # Check if the token's jti is in the blacklist, or if every
+                # session of the user was revoked after it was issued
+                if revocation_store.is_revoked(
+                    jti
+                ) or not session_epoch_store.is_current(access_token):
                     return JsonResponse(
                         {
                             "status": "error",
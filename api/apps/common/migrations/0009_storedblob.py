@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("common", "0008_blacklistedtoken_expires_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("digest", models.CharField(max_length=64, unique=True)),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("size", models.PositiveBigIntegerField()),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                (
+                    "source_digest",
+                    models.CharField(
+                        blank=True,
+                        db_index=True,
+                        help_text="Digest of the blob this one was derived from, e.g. an original photo",
+                        max_length=64,
+                        null=True,
+                    ),
+                ),
+                (
+                    "derived_names",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text="Files derived from this blob and deleted with it",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Stored Blob",
+                "verbose_name_plural": "Stored Blobs",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
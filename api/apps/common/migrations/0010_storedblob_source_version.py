@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("common", "0009_storedblob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="storedblob",
+            name="source_version",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Version of the settings this blob was derived from its source with",
+                null=True,
+            ),
+        ),
+    ]
@@ -51,6 +51,7 @@ class ActiveBaseModel(models.Model):
 
 class BlacklistedToken(models.Model):
     jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -74,3 +75,41 @@ class TaskLog(BaseModel):
         ordering = ["-created_at"]
         verbose_name = "Task Log"
         verbose_name_plural = "Task Logs"
+
+
+class StoredBlob(models.Model):
+    """
+    A file in apps.common.storage.DeduplicatedStorage, stored once per content
+    digest and shared by every field that references it.
+    """
+
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    source_digest = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Digest of the blob this one was derived from, e.g. an original photo",
+    )
+    source_version = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Version of the settings this blob was derived from its source with",
+    )
+    derived_names = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Files derived from this blob and deleted with it",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Stored Blob"
+        verbose_name_plural = "Stored Blobs"
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
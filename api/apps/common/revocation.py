@@ -0,0 +1,366 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist import models as simplejwt_models
+
+from apps.common.models import BlacklistedToken
+from utilities.database import delete_in_batches
+
+logger = logging.getLogger(__name__)
+
+REVOKED_JTI_CACHE_KEY = "revoked_jti:{jti}"
+REVOCATION_FILTER_CACHE_KEY = "revocation_filter"
+REVOCATION_VERSION_CACHE_KEY = "revocation_filter_version"
+REVOCATION_LOCK_CACHE_KEY = "revocation_filter_lock"
+USER_TOKEN_EPOCH_CACHE_KEY = "user_token_epoch:{user_id}"
+
+# Claim carrying the user's token epoch at the time the token was issued
+TOKEN_EPOCH_CLAIM = "token_epoch"
+
+# How long a "not revoked" answer for a bloom filter false positive is cached
+NEGATIVE_LOOKUP_TIMEOUT = 300
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter.
+    A miss is definitive, a hit only means the key may have been added.
+    """
+
+    def __init__(self, size, hash_count, bits=None):
+        self.size = size
+        self.hash_count = hash_count
+        self.bits = bytearray(bits) if bits else bytearray((size + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate):
+        size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        hash_count = max(1, round(size / capacity * math.log(2)))
+        return cls(size, hash_count)
+
+    @classmethod
+    def from_state(cls, state):
+        size, hash_count, bits = state
+        return cls(size, hash_count, bits)
+
+    def to_state(self):
+        return self.size, self.hash_count, bytes(self.bits)
+
+    def _indexes(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for index in self._indexes(key):
+            self.bits[index >> 3] |= 1 << (index & 7)
+
+    def __contains__(self, key):
+        return all(
+            self.bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(key)
+        )
+
+
+@contextmanager
+def cache_lock(key, timeout=10, wait=5):
+    """
+    Best-effort distributed lock built on the atomic `cache.add`.
+    Gives up waiting after `wait` seconds and runs the block anyway.
+    """
+    deadline = time.monotonic() + wait
+    acquired = cache.add(key, 1, timeout)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.05)
+        acquired = cache.add(key, 1, timeout)
+
+    if not acquired:
+        logger.warning(f"Could not acquire cache lock {key}, continuing without it")
+
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(key)
+
+
+class RevocationStore:
+    """
+    Keeps revoked access token JTIs in the cache with a TTL equal to the token's
+    remaining lifetime, fronted by an in-process Bloom filter so that the common
+    "not revoked" answer never leaves the worker.
+
+    The filter is shared through the cache and re-synced every
+    TOKEN_REVOCATION["FILTER_SYNC_SECONDS"]. BlacklistedToken is the durable
+    source the filter and the cache entries are rebuilt from.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._version = None
+        self._synced_at = 0.0
+
+    @property
+    def config(self):
+        return settings.TOKEN_REVOCATION
+
+    @staticmethod
+    def _access_token_lifetime():
+        return settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"]
+
+    @staticmethod
+    def _timeout_for(expires_at):
+        return max(1, int((expires_at - timezone.now()).total_seconds()))
+
+    @classmethod
+    def _expiry_of(cls, expires_at, created_at):
+        # Rows written before expires_at existed live for one access token lifetime
+        return expires_at or created_at + cls._access_token_lifetime()
+
+    @classmethod
+    def expired_filter(cls):
+        now = timezone.now()
+        return Q(expires_at__lte=now) | Q(
+            expires_at__isnull=True, created_at__lte=now - cls._access_token_lifetime()
+        )
+
+    def revoke(self, jti, expires_at=None):
+        """
+        Revoke a token by its JTI until `expires_at`.
+        Defaults to a full access token lifetime when the expiry is unknown.
+        """
+        if expires_at is None:
+            expires_at = timezone.now() + self._access_token_lifetime()
+
+        BlacklistedToken.objects.update_or_create(
+            jti=jti, defaults={"expires_at": expires_at}
+        )
+
+        if expires_at > timezone.now():
+            cache.set(
+                REVOKED_JTI_CACHE_KEY.format(jti=jti),
+                True,
+                self._timeout_for(expires_at),
+            )
+            self._publish(jti)
+
+    def revoke_access_token(self, access_token):
+        """
+        Revoke a validated simplejwt AccessToken.
+        """
+        expires_at = datetime.fromtimestamp(access_token["exp"], tz=dt_timezone.utc)
+        self.revoke(access_token["jti"], expires_at=expires_at)
+
+    def is_revoked(self, jti):
+        self._sync()
+
+        if jti not in self._filter:
+            return False
+
+        cache_key = REVOKED_JTI_CACHE_KEY.format(jti=jti)
+        revoked = cache.get(cache_key)
+        if revoked is not None:
+            return revoked
+
+        # Either a false positive or the cache entry was evicted, ask the durable store
+        row = (
+            BlacklistedToken.objects.filter(jti=jti)
+            .values_list("expires_at", "created_at")
+            .first()
+        )
+        if row is not None:
+            expires_at = self._expiry_of(*row)
+            if expires_at > timezone.now():
+                cache.set(cache_key, True, self._timeout_for(expires_at))
+                return True
+
+        cache.set(cache_key, False, NEGATIVE_LOOKUP_TIMEOUT)
+        return False
+
+    def rebuild(self):
+        """
+        Rebuild the shared filter and the cache entries from BlacklistedToken.
+        """
+        with cache_lock(REVOCATION_LOCK_CACHE_KEY):
+            bloom_filter = self._build_from_database()
+            self._store(bloom_filter)
+
+    def _build_from_database(self):
+        bloom_filter = BloomFilter.for_capacity(
+            self.config["FILTER_CAPACITY"], self.config["FILTER_ERROR_RATE"]
+        )
+        live_tokens = BlacklistedToken.objects.exclude(
+            self.expired_filter()
+        ).values_list("jti", "expires_at", "created_at")
+
+        for jti, expires_at, created_at in live_tokens.iterator(chunk_size=2000):
+            bloom_filter.add(jti)
+            cache.set(
+                REVOKED_JTI_CACHE_KEY.format(jti=jti),
+                True,
+                self._timeout_for(self._expiry_of(expires_at, created_at)),
+            )
+        return bloom_filter
+
+    def _publish(self, jti):
+        with cache_lock(REVOCATION_LOCK_CACHE_KEY):
+            cached = cache.get(REVOCATION_FILTER_CACHE_KEY)
+            if cached is None:
+                # The durable row is already written, so a rebuild includes this jti
+                bloom_filter = self._build_from_database()
+            else:
+                bloom_filter = BloomFilter.from_state(cached[1])
+                bloom_filter.add(jti)
+            self._store(bloom_filter)
+
+    def _store(self, bloom_filter):
+        version = uuid.uuid4().hex
+        cache.set_many(
+            {
+                REVOCATION_FILTER_CACHE_KEY: (version, bloom_filter.to_state()),
+                REVOCATION_VERSION_CACHE_KEY: version,
+            },
+            timeout=None,
+        )
+        with self._lock:
+            self._filter = bloom_filter
+            self._version = version
+            self._synced_at = time.monotonic()
+
+    def _sync(self):
+        now = time.monotonic()
+        if (
+            self._filter is not None
+            and now - self._synced_at < self.config["FILTER_SYNC_SECONDS"]
+        ):
+            return
+
+        version = cache.get(REVOCATION_VERSION_CACHE_KEY)
+        if self._filter is not None and version == self._version:
+            self._synced_at = now
+            return
+
+        cached = cache.get(REVOCATION_FILTER_CACHE_KEY)
+        if cached is None or version is None:
+            self.rebuild()
+            return
+
+        # The filter carries its own version so a publish racing this read is
+        # picked up on the next sync instead of being masked
+        cached_version, state = cached
+        with self._lock:
+            self._filter = BloomFilter.from_state(state)
+            self._version = cached_version
+            self._synced_at = now
+
+
+class SessionEpochStore:
+    """
+    Per-user token epoch. Every token carries the epoch it was issued under and
+    is rejected once the user's epoch moves past it, so revoking all of a user's
+    sessions is a single write and checking it is a single cache lookup.
+    """
+
+    @staticmethod
+    def _cache_key(user_id):
+        return USER_TOKEN_EPOCH_CACHE_KEY.format(user_id=user_id)
+
+    def get(self, user_id):
+        """
+        Return the user's current epoch, or None if the user no longer exists.
+        """
+        cache_key = self._cache_key(user_id)
+        epoch = cache.get(cache_key)
+        if epoch is None:
+            epoch = (
+                get_user_model()
+                .objects.filter(pk=user_id)
+                .values_list("token_epoch", flat=True)
+                .first()
+            )
+            if epoch is not None:
+                cache.set(
+                    cache_key,
+                    epoch,
+                    int(settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"].total_seconds()),
+                )
+        return epoch
+
+    def is_current(self, token):
+        user_id = token.get(settings.SIMPLE_JWT["USER_ID_CLAIM"])
+        if user_id is None:
+            return True
+        epoch = self.get(user_id)
+        return epoch is not None and token.get(TOKEN_EPOCH_CLAIM, 0) >= epoch
+
+    def bump(self, user_id):
+        """
+        Invalidate every token issued to the user so far and return the new epoch.
+        """
+        user_model = get_user_model()
+        user_model.objects.filter(pk=user_id).update(token_epoch=F("token_epoch") + 1)
+        self.invalidate(user_id)
+        return (
+            user_model.objects.filter(pk=user_id)
+            .values_list("token_epoch", flat=True)
+            .first()
+        )
+
+    def invalidate(self, user_id):
+        """
+        Drop the cached epoch now and again once the surrounding transaction
+        commits, so a reader never caches the pre-commit value for long.
+        """
+        cache_key = self._cache_key(user_id)
+        cache.delete(cache_key)
+        transaction.on_commit(lambda: cache.delete(cache_key))
+
+
+revocation_store = RevocationStore()
+session_epoch_store = SessionEpochStore()
+
+
+def purge_expired_tokens(batch_size=1000, sleep_seconds=0.1):
+    """
+    Delete expired rows from BlacklistedToken and from simplejwt's
+    token_blacklist tables in bounded batches, then rebuild the revocation
+    filter so purged JTIs stop occupying it.
+
+    :return: Number of rows deleted per table.
+    """
+    now = timezone.now()
+    deleted = {
+        "blacklisted_tokens": delete_in_batches(
+            BlacklistedToken.objects.filter(RevocationStore.expired_filter()),
+            batch_size=batch_size,
+            sleep_seconds=sleep_seconds,
+        ),
+        # Blacklist entries first, so each outstanding batch cascades to nothing
+        "simplejwt_blacklisted_tokens": delete_in_batches(
+            simplejwt_models.BlacklistedToken.objects.filter(
+                token__expires_at__lte=now
+            ),
+            batch_size=batch_size,
+            sleep_seconds=sleep_seconds,
+        ),
+        "outstanding_tokens": delete_in_batches(
+            simplejwt_models.OutstandingToken.objects.filter(expires_at__lte=now),
+            batch_size=batch_size,
+            sleep_seconds=sleep_seconds,
+        ),
+    }
+    revocation_store.rebuild()
+    return deleted
@@ -0,0 +1,197 @@
+import hashlib
+import os
+
+from django.core.files.storage import Storage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+from django.utils.module_loading import import_string
+
+from apps.common.models import StoredBlob
+
+# Blobs are stored as <BLOB_PREFIX>/<first two hex digits>/<sha256><extension>
+BLOB_PREFIX = "blobs"
+
+
+def hash_content(content):
+    """
+    Hash a file in chunks without reading it into memory.
+
+    :param content: A Django File.
+    :return: Tuple of (sha256 hex digest, size in bytes).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest(), size
+
+
+@deconstructible
+class DeduplicatedStorage(Storage):
+    """
+    Content-addressed, reference-counted wrapper around another storage.
+
+    Saving hashes the upload and stores it once under its digest; saving the
+    same bytes again only takes another reference on the existing blob, and
+    the file is deleted when its last reference is. Files derived from a blob
+    (image variants) can be attached to it and share its lifetime.
+
+    Works with any backend, e.g. FileSystemStorage locally and
+    MediaCloudinaryStorage in production:
+
+        "default": {
+            "BACKEND": "apps.common.storage.DeduplicatedStorage",
+            "OPTIONS": {"backend": "django.core.files.storage.FileSystemStorage"},
+        }
+
+    Files saved before the wrapper was enabled have no StoredBlob row and are
+    passed straight through to the wrapped storage.
+    """
+
+    def __init__(self, backend, options=None):
+        self.backend = backend
+        self.options = options or {}
+        self.inner = import_string(backend)(**self.options)
+
+    def get_available_name(self, name, max_length=None):
+        # _save picks the final name, so skip the wrapped storage's exists() call
+        return name
+
+    def _open(self, name, mode="rb"):
+        return self.inner.open(name, mode)
+
+    def _save(self, name, content):
+        digest, size = hash_content(content)
+
+        existing_name = self.add_reference(digest=digest)
+        if existing_name:
+            return existing_name
+
+        extension = os.path.splitext(name)[1].lower()
+        stored_name = self.inner.save(
+            f"{BLOB_PREFIX}/{digest[:2]}/{digest}{extension}", content
+        )
+        with transaction.atomic():
+            blob, created = StoredBlob.objects.select_for_update().get_or_create(
+                digest=digest, defaults={"name": stored_name, "size": size}
+            )
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+
+        if not created and blob.name != stored_name:
+            # A concurrent upload of the same bytes won the race
+            self.inner.delete(stored_name)
+        return blob.name
+
+    def add_reference(self, name=None, digest=None):
+        """
+        Take another reference on an existing blob, by name or digest.
+
+        :return: The blob's name, or None if there is no such blob.
+        """
+        lookup = {"digest": digest} if digest else {"name": name}
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(**lookup).first()
+            if blob is None:
+                return None
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+        return blob.name
+
+    def delete(self, name):
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                self.inner.delete(name)
+                return
+            if blob.ref_count > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(
+                    ref_count=F("ref_count") - 1
+                )
+                return
+            blob.delete()
+
+            # Last reference gone, remove the file and everything derived from it
+            names = [blob.name, *blob.derived_names]
+            transaction.on_commit(lambda: self._delete_files(names))
+
+    def _delete_files(self, names):
+        for name in names:
+            self.inner.delete(name)
+
+    def save_derived(self, name, derived_name, content):
+        """
+        Store a file derived from the blob `name` under exactly `derived_name`,
+        deleted together with the blob.
+        """
+        if self.inner.exists(derived_name):
+            self.inner.delete(derived_name)
+        stored_name = self.inner.save(derived_name, content)
+
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().get(name=name)
+            if stored_name not in blob.derived_names:
+                blob.derived_names.append(stored_name)
+                blob.save(update_fields=["derived_names"])
+        return stored_name
+
+    def link_source(self, name, source_name, version=None):
+        """
+        Record that the blob `name` was produced from the blob `source_name`,
+        optionally by `version` of the settings that produced it.
+        """
+        source_digest = (
+            StoredBlob.objects.filter(name=source_name)
+            .values_list("digest", flat=True)
+            .first()
+        )
+        if source_digest:
+            StoredBlob.objects.filter(name=name).update(
+                source_digest=source_digest, source_version=version
+            )
+
+    def find_by_source(self, source_name, version=None):
+        """
+        Name of a blob previously produced from the same bytes as
+        `source_name`, or None. With `version`, only a blob produced by that
+        version of the settings counts.
+        """
+        source_digest = (
+            StoredBlob.objects.filter(name=source_name)
+            .values_list("digest", flat=True)
+            .first()
+        )
+        if source_digest is None:
+            return None
+        derived = StoredBlob.objects.filter(source_digest=source_digest)
+        if version is not None:
+            derived = derived.filter(source_version=version)
+        return derived.values_list("name", flat=True).first()
+
+    def exists(self, name):
+        return self.inner.exists(name)
+
+    def listdir(self, path):
+        return self.inner.listdir(path)
+
+    def size(self, name):
+        return self.inner.size(name)
+
+    def url(self, name):
+        return self.inner.url(name)
+
+    def path(self, name):
+        return self.inner.path(name)
+
+    def get_accessed_time(self, name):
+        return self.inner.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.inner.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.inner.get_modified_time(name)
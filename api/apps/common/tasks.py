@@ -0,0 +1,96 @@
+from celery import shared_task
+from celery.signals import worker_process_init, worker_process_shutdown
+from django.conf import settings
+
+from apps.common.revocation import purge_expired_tokens as purge_tokens
+from utilities.email_templates import email_templates
+from utilities.general import create_success_task_log
+from utilities.mail import build_message, mail_dispatcher
+from utilities.sms import SMSMessage, get_sms_backend
+
+
+@worker_process_init.connect
+@worker_process_shutdown.connect
+def close_mail_connection(**kwargs):
+    # Forked workers must not share the parent's SMTP socket
+    mail_dispatcher.close()
+
+
+@worker_process_init.connect
+def preload_email_templates(**kwargs):
+    email_templates.preload()
+
+
+@shared_task
+def purge_expired_tokens(batch_size=1000, sleep_seconds=0.1):
+    """
+    Periodically remove expired revocations and simplejwt outstanding tokens.
+    """
+    deleted = purge_tokens(batch_size=batch_size, sleep_seconds=sleep_seconds)
+    create_success_task_log(
+        checkpoint="purge_expired_tokens",
+        message=", ".join(f"{table}: {count}" for table, count in deleted.items()),
+    )
+    return deleted
+
+
+@shared_task
+def send_bulk_email(messages):
+    """
+    Fan a queue of messages out into one send_email_batch task per batch, so a
+    failed batch is retried on its own instead of resending every message
+    that already went out.
+
+    :param messages: List of dicts with `subject`, `body`, `to` and optionally
+        `html_message` and `from_email`.
+    :return: Number of batches queued.
+    """
+    batch_size = settings.MAIL_DISPATCHER["BATCH_SIZE"]
+    batches = [
+        messages[start : start + batch_size] for start in range(0, len(messages), batch_size)
+    ]
+    for batch in batches:
+        send_email_batch.delay(batch)
+    return len(batches)
+
+
+@shared_task(
+    autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=600, max_retries=5
+)
+def send_email_batch(messages):
+    """
+    Send one batch of messages through the worker's pooled mail connection.
+
+    :param messages: List of at most MAIL_DISPATCHER["BATCH_SIZE"] message dicts.
+    """
+    return mail_dispatcher.send(build_message(**message) for message in messages)
+
+
+@shared_task
+def send_bulk_sms(messages):
+    """
+    Fan a queue of SMS messages out into one send_sms_batch task per
+    provider-sized batch, so only a failed batch is retried.
+
+    :param messages: List of dicts with `to` and `body`.
+    :return: Number of batches queued.
+    """
+    batch_size = settings.SMS_GATEWAY["BATCH_SIZE"]
+    batches = [
+        messages[start : start + batch_size] for start in range(0, len(messages), batch_size)
+    ]
+    for batch in batches:
+        send_sms_batch.delay(batch)
+    return len(batches)
+
+
+@shared_task(
+    autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=600, max_retries=5
+)
+def send_sms_batch(messages):
+    """
+    Send one batch of SMS messages in a single provider call.
+
+    :param messages: List of at most SMS_GATEWAY["BATCH_SIZE"] message dicts.
+    """
+    return get_sms_backend().send_messages(SMSMessage(**message) for message in messages)
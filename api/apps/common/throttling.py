@@ -0,0 +1,37 @@
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from utilities.rate_limit import rate_limiter
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle backed by the atomic token bucket rate limiter. Subclasses return
+    the buckets a request draws from; the request is allowed only if every
+    bucket has a token left, and a denied request consumes none.
+    """
+
+    scope = None
+
+    def get_buckets(self, request, view):
+        """
+        Return a list of (bucket name, identifier) pairs for the request. Each
+        bucket name is looked up in TOKEN_BUCKET_RATES.
+        """
+        return [("ip", self.get_ident(request))]
+
+    def allow_request(self, request, view):
+        rates = settings.TOKEN_BUCKET_RATES
+        buckets = [
+            (f"throttle:{self.scope}:{name}:{ident}", rates[f"{self.scope}_{name}"])
+            for name, ident in self.get_buckets(request, view)
+            if ident
+        ]
+        if not buckets:
+            return True
+
+        allowed, self.retry_after = rate_limiter.consume(buckets)
+        return allowed
+
+    def wait(self):
+        return getattr(self, "retry_after", None)
@@ -4,6 +4,7 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import Group as DjangoGroup
 
 from apps.core.models.account import *
+from apps.core.models.service_area import ServiceArea, ServiceAreaAlias
 
 
 class Group(DjangoGroup):
@@ -125,11 +126,12 @@ class CustomerProfileAdmin(admin.ModelAdmin):
         "date_of_birth", 
         "created_at", 
         "updated_at")
+    list_filter = ("service_areas",)
     search_fields = (
         "user__email", 
         "user__full_name", 
-        "preferred_service_areas"
         )
+    autocomplete_fields = ("service_areas",)
     list_per_page = 20
     fieldsets = [
         (
@@ -138,8 +140,9 @@ class CustomerProfileAdmin(admin.ModelAdmin):
                 "fields": [
                     "user",
                     "date_of_birth",
-                    "preferred_service_areas",
+                    "service_areas",
                     "profile_photo",
+                    "profile_photo_status",
                     "notification_preferences",
                 ],
             },
@@ -156,7 +159,7 @@ class CustomerProfileAdmin(admin.ModelAdmin):
             },
         ),
     ]
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = ("created_at", "updated_at", "profile_photo_status")
 
 
 @admin.register(ServiceProviderProfile)
@@ -173,8 +176,16 @@ class ServiceProviderProfileAdmin(admin.ModelAdmin):
         "total_rating",
         "created_at"
     )
-    list_filter = ("user__is_active", "is_verified", "is_business", "is_registered_business", "is_available")
+    list_filter = (
+        "user__is_active",
+        "is_verified",
+        "is_business",
+        "is_registered_business",
+        "is_available",
+        "service_areas",
+    )
     search_fields = ("user__email", "user__full_name", "business_name", "address")
+    autocomplete_fields = ("service_areas",)
     list_per_page = 20
     fieldsets = [
         (
@@ -187,7 +198,9 @@ class ServiceProviderProfileAdmin(admin.ModelAdmin):
                     "is_registered_business",
                     "address",
                     "service_description",
+                    "service_areas",
                     "profile_photo",
+                    "profile_photo_status",
                     "notification_preferences",
                     "average_rating",
                     "total_rating",
@@ -226,7 +239,7 @@ class ServiceProviderProfileAdmin(admin.ModelAdmin):
             },
         ),
     ]
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = ("created_at", "updated_at", "profile_photo_status")
 
 
 @admin.register(Address)
@@ -271,4 +284,21 @@ class AddressAdmin(admin.ModelAdmin):
     ]
     readonly_fields = ("created_at", "updated_at")
 
+class ServiceAreaAliasInline(admin.TabularInline):
+    model = ServiceAreaAlias
+    fields = ("name", "slug")
+    readonly_fields = ("slug",)
+    extra = 1
+
+
+@admin.register(ServiceArea)
+class ServiceAreaAdmin(admin.ModelAdmin):
+    list_display = ("name", "slug", "created_at")
+    search_fields = ("name", "slug", "aliases__name")
+    inlines = [ServiceAreaAliasInline]
+    list_per_page = 20
+    fields = ("name", "slug", "created_at", "updated_at")
+    readonly_fields = ("slug", "created_at", "updated_at")
+
+
 admin.site.unregister(DjangoGroup)
@@ -1,6 +1,74 @@
 from django.apps import AppConfig
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+
+def _file_fields(model, update_fields=None):
+    return [
+        field.name
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+        and (update_fields is None or field.name in update_fields)
+    ]
+
+
+def release_replaced_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Release the stored file behind a file field that is being replaced by a
+    new upload or cleared, so reference-counted blobs are freed.
+    """
+    if raw or instance._state.adding:
+        return
+    field_names = _file_fields(sender, update_fields)
+    if not field_names:
+        return
+    stored = sender._base_manager.filter(pk=instance.pk).values(*field_names).first()
+    for field_name, name in (stored or {}).items():
+        file = getattr(instance, field_name)
+        # A committed name that differs from the row is a stale instance
+        # saved over a background swap, never a reason to free a file
+        if name and (not file or not file._committed):
+            instance.release_file(field_name, name)
+
+
+def release_deleted_files(sender, instance, **kwargs):
+    for field_name in _file_fields(sender):
+        file = getattr(instance, field_name)
+        if file:
+            instance.release_file(field_name, file.name)
+
+
+def update_provider_locator(sender, instance, **kwargs):
+    from apps.core.locator import provider_locator
+
+    if provider_locator.loaded:
+        transaction.on_commit(lambda: provider_locator.update_from_instance(instance))
+
+
+def remove_from_provider_locator(sender, instance, **kwargs):
+    from apps.core.locator import provider_locator
+
+    if provider_locator.loaded:
+        provider_id = str(instance.pk)
+        transaction.on_commit(lambda: provider_locator.remove(provider_id))
 
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.core"
+
+    def ready(self):
+        from utilities.email_templates import email_templates
+
+        email_templates.register(
+            "email_verification",
+            subject="Verify Your Email Address",
+            html_template_name="emails/email_verification.html",
+        )
+
+        provider_model = self.get_model("ServiceProviderProfile")
+        for model in (self.get_model("CustomerProfile"), provider_model):
+            pre_save.connect(release_replaced_files, sender=model)
+            post_delete.connect(release_deleted_files, sender=model)
+        post_save.connect(update_provider_locator, sender=provider_model)
+        post_delete.connect(remove_from_provider_locator, sender=provider_model)
@@ -5,3 +5,21 @@ USER_TYPES = (
     (CUSTOMER, 'Customer'),
     (SERVICE_PROVIDER, 'Service Provider'),
 )
+
+EMAIL_VERIFICATION = 'email'
+PHONE_VERIFICATION = 'phone'
+
+VERIFICATION_PURPOSES = (
+    (EMAIL_VERIFICATION, 'Email'),
+    (PHONE_VERIFICATION, 'Phone'),
+)
+
+PHOTO_PENDING = 'pending'
+PHOTO_READY = 'ready'
+PHOTO_FAILED = 'failed'
+
+PHOTO_STATUSES = (
+    (PHOTO_PENDING, 'Pending'),
+    (PHOTO_READY, 'Ready'),
+    (PHOTO_FAILED, 'Failed'),
+)
@@ -0,0 +1,186 @@
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+PENDING_KEY = "dispatch:pending"
+LOAD_KEY = "dispatch:load:{provider_id}"
+ASSIGNMENT_KEY = "dispatch:assignment:{job_id}"
+
+
+class DispatchQueue:
+    """
+    Pending jobs waiting for the next assignment window, the provider each
+    assigned job went to, and how many jobs each provider is working on.
+
+    On the Redis cache pending jobs are a list that `take` pops a batch from
+    atomically, so API workers can enqueue while a Celery worker assigns.
+    Each provider's load is a sorted set of job ids scored by assignment
+    time; a job counts until it is released or ASSIGNMENT_TTL_SECONDS have
+    passed, so a job that is never released cannot hold a provider at
+    MAX_LOAD forever. Other cache backends (locmem in development) keep the
+    pending list and each provider's jobs as plain cache entries, read and
+    written back under a process lock.
+    """
+
+    def __init__(self, cache_alias="default"):
+        self.cache = caches[cache_alias]
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return settings.DISPATCH
+
+    def _redis(self):
+        if isinstance(self.cache, RedisCache):
+            return self.cache._cache.get_client(write=True)
+        return None
+
+    def _key(self, key):
+        return self.cache.make_key(key)
+
+    def enqueue(self, job):
+        """
+        Add a job, a dict with at least id, latitude and longitude.
+        """
+        client = self._redis()
+        if client is None:
+            with self._lock:
+                pending = self.cache.get(PENDING_KEY) or []
+                pending.append(job)
+                self.cache.set(PENDING_KEY, pending, None)
+            return
+        client.rpush(self._key(PENDING_KEY), json.dumps(job))
+
+    def requeue(self, jobs):
+        """
+        Put jobs back at the head of the queue, in their original order.
+        """
+        if not jobs:
+            return
+        client = self._redis()
+        if client is None:
+            with self._lock:
+                pending = self.cache.get(PENDING_KEY) or []
+                self.cache.set(PENDING_KEY, list(jobs) + pending, None)
+            return
+        client.lpush(self._key(PENDING_KEY), *[json.dumps(job) for job in reversed(jobs)])
+
+    def take(self, limit):
+        """
+        Remove and return up to `limit` jobs, oldest first.
+        """
+        client = self._redis()
+        if client is None:
+            with self._lock:
+                pending = self.cache.get(PENDING_KEY) or []
+                if pending:
+                    self.cache.set(PENDING_KEY, pending[limit:], None)
+                return pending[:limit]
+
+        key = self._key(PENDING_KEY)
+        pipeline = client.pipeline(transaction=True)
+        pipeline.lrange(key, 0, limit - 1)
+        pipeline.ltrim(key, limit, -1)
+        jobs, _ = pipeline.execute()
+        return [json.loads(job) for job in jobs]
+
+    def __len__(self):
+        client = self._redis()
+        if client is None:
+            return len(self.cache.get(PENDING_KEY) or [])
+        return client.llen(self._key(PENDING_KEY))
+
+    def _load_key(self, provider_id):
+        return self._key(LOAD_KEY.format(provider_id=provider_id))
+
+    def loads(self, provider_ids):
+        """
+        :return: List of the number of jobs each provider is working on.
+        """
+        provider_ids = [str(provider_id) for provider_id in provider_ids]
+        cutoff = time.time() - self.config["ASSIGNMENT_TTL_SECONDS"]
+        client = self._redis()
+        if client is None:
+            load_keys = [LOAD_KEY.format(provider_id=provider_id) for provider_id in provider_ids]
+            loads = self.cache.get_many(load_keys)
+            return [
+                sum(assigned_at >= cutoff for assigned_at in loads.get(load_key, {}).values())
+                for load_key in load_keys
+            ]
+        if not provider_ids:
+            return []
+
+        pipeline = client.pipeline(transaction=False)
+        for provider_id in provider_ids:
+            load_key = self._load_key(provider_id)
+            pipeline.zremrangebyscore(load_key, "-inf", f"({cutoff}")
+            pipeline.zcard(load_key)
+        return pipeline.execute()[1::2]
+
+    def record_assignments(self, assignments):
+        """
+        Store the provider of each assigned job and add to provider loads.
+
+        :param assignments: List of (job id, provider id) pairs.
+        """
+        now = time.time()
+        client = self._redis()
+        if client is None:
+            cutoff = now - self.config["ASSIGNMENT_TTL_SECONDS"]
+            with self._lock:
+                loads = {}
+                for job_id, provider_id in assignments:
+                    load_key = LOAD_KEY.format(provider_id=provider_id)
+                    if load_key not in loads:
+                        jobs = self.cache.get(load_key) or {}
+                        # Timed out jobs are dropped whenever the entry is written
+                        loads[load_key] = {
+                            job: assigned_at
+                            for job, assigned_at in jobs.items()
+                            if assigned_at >= cutoff
+                        }
+                    loads[load_key][str(job_id)] = now
+                self.cache.set_many(loads, self.config["ASSIGNMENT_TTL_SECONDS"])
+        else:
+            pipeline = client.pipeline(transaction=False)
+            for job_id, provider_id in assignments:
+                load_key = self._load_key(provider_id)
+                pipeline.zadd(load_key, {str(job_id): now})
+                pipeline.expire(load_key, self.config["ASSIGNMENT_TTL_SECONDS"])
+            pipeline.execute()
+
+        self.cache.set_many(
+            {
+                ASSIGNMENT_KEY.format(job_id=job_id): str(provider_id)
+                for job_id, provider_id in assignments
+            },
+            self.config["ASSIGNMENT_TTL_SECONDS"],
+        )
+
+    def assignment_for(self, job_id):
+        """
+        :return: The id of the provider a job was assigned to, or None.
+        """
+        return self.cache.get(ASSIGNMENT_KEY.format(job_id=job_id))
+
+    def release(self, provider_id, job_id):
+        """
+        Take a finished job off a provider's load before it times out.
+        """
+        provider_id, job_id = str(provider_id), str(job_id)
+        client = self._redis()
+        if client is None:
+            load_key = LOAD_KEY.format(provider_id=provider_id)
+            with self._lock:
+                jobs = self.cache.get(load_key) or {}
+                if jobs.pop(job_id, None) is not None:
+                    self.cache.set(load_key, jobs, self.config["ASSIGNMENT_TTL_SECONDS"])
+            return
+        client.zrem(self._load_key(provider_id), job_id)
+
+
+dispatch_queue = DispatchQueue()
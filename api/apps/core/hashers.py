@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    BCryptSHA256PasswordHasher,
+    PBKDF2PasswordHasher,
+)
+
+# Work factors come from settings so `manage.py tune_password_hashers` output can
+# be applied without a code change. Hashes made with other parameters are
+# upgraded transparently on the next successful login (must_update).
+PARAMS = settings.PASSWORD_HASHER_PARAMS
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = PARAMS["PBKDF2_ITERATIONS"]
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = PARAMS["ARGON2_TIME_COST"]
+    memory_cost = PARAMS["ARGON2_MEMORY_COST"]
+    parallelism = PARAMS["ARGON2_PARALLELISM"]
+
+
+class TunedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    rounds = PARAMS["BCRYPT_ROUNDS"]
@@ -0,0 +1,314 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from utilities.geo import EARTH_RADIUS_KM, bounding_box
+
+LocatedProvider = namedtuple('LocatedProvider', ['id', 'distance_km', 'rating'])
+
+
+class ProviderLocator:
+    """
+    In-process index of service providers for high-rate lookups without
+    touching the database: ratings and verification by id for dispatch and
+    live search, and radius and k-nearest queries by stored location.
+
+    Only what changes rarely is indexed. Whether a provider is online, and
+    where they are right now, is live state kept by apps.core.presence, so
+    callers filter availability through the presence store.
+
+    Coordinates, ratings and verification live in NumPy arrays indexed by
+    slot; providers without a stored location are kept for id lookups but
+    left out of the grid. A grid of CELL_DEGREES cells, kept as slots sorted
+    by cell key, narrows each query to a few contiguous ranges, and
+    distances are computed with a vectorized haversine. Slots changed since the grid was last
+    sorted are tracked separately and always included as candidates, so
+    updates are O(1) and the grid is only re-sorted once enough accumulate.
+
+    Kept current by post_save/post_delete signals in this process and by
+    polling `updated_at` (the change feed) for writes made by other
+    processes, with a periodic full reload to pick up deletions.
+    """
+
+    def __init__(self, cell_degrees=None, auto_sync=True):
+        self.auto_sync = auto_sync
+        self.cell_degrees = cell_degrees or settings.PROVIDER_LOCATOR['CELL_DEGREES']
+        self.columns = int(np.ceil(360 / self.cell_degrees)) + 1
+        self._lock = threading.RLock()
+        self.loaded = False
+        self._synced_at = None
+        self._sync_checked = 0.0
+        self._loaded_at = 0.0
+        self._reset(capacity=1024)
+
+    def _reset(self, capacity):
+        self._ids = np.empty(capacity, dtype=object)
+        self._lat = np.zeros(capacity)
+        self._lon = np.zeros(capacity)
+        self._rating = np.zeros(capacity, dtype=np.float32)
+        self._verified = np.zeros(capacity, dtype=bool)
+        self._used = np.zeros(capacity, dtype=bool)
+        self._slots = {}
+        self._free = []
+        self._size = 0
+        self._sorted_keys = np.empty(0, dtype=np.int64)
+        self._sorted_slots = np.empty(0, dtype=np.int64)
+        self._dirty = set()
+
+    def __len__(self):
+        return len(self._slots)
+
+    # Loading and updates
+
+    def bulk_load(self, ids, latitudes, longitudes, ratings, verified):
+        """
+        Replace the index contents with the given arrays.
+        """
+        count = len(ids)
+        with self._lock:
+            self._reset(capacity=max(1024, count))
+            self._ids[:count] = ids
+            self._lat[:count] = latitudes
+            self._lon[:count] = longitudes
+            self._rating[:count] = ratings
+            self._verified[:count] = verified
+            self._used[:count] = True
+            self._slots = {provider_id: slot for slot, provider_id in enumerate(ids)}
+            self._size = count
+            self._reindex()
+            self.loaded = True
+            self._synced_at = timezone.now()
+            self._loaded_at = time.monotonic()
+
+    def load(self):
+        """
+        Load every provider from the database.
+        """
+        from apps.core.models import ServiceProviderProfile
+
+        rows = list(
+            ServiceProviderProfile.objects.values_list(
+                'id', 'latitude', 'longitude', 'average_rating', 'is_verified'
+            ).iterator(chunk_size=10_000)
+        )
+        self.bulk_load(
+            [str(row[0]) for row in rows],
+            [np.nan if row[1] is None else row[1] for row in rows],
+            [np.nan if row[2] is None else row[2] for row in rows],
+            [float(row[3]) for row in rows],
+            [row[4] for row in rows],
+        )
+
+    def sync(self):
+        """
+        Apply changes written by any process since the last load or sync,
+        using `updated_at` as a change feed. Runs at most once every
+        SYNC_SECONDS; a full reload every FULL_RELOAD_SECONDS picks up deletes.
+
+        `updated_at` is set before the writing transaction commits, so each
+        poll reaches SYNC_LAG_SECONDS further back than the last one to catch
+        rows that committed late. Rows seen twice are simply applied again.
+        """
+        from apps.core.models import ServiceProviderProfile
+
+        config = settings.PROVIDER_LOCATOR
+        now = time.monotonic()
+        if not self.loaded or now - self._loaded_at > config['FULL_RELOAD_SECONDS']:
+            self.load()
+            return
+        if now - self._sync_checked < config['SYNC_SECONDS']:
+            return
+
+        with self._lock:
+            self._sync_checked = now
+            started_at = timezone.now()
+            changed = ServiceProviderProfile.objects.filter(
+                updated_at__gte=self._synced_at - timedelta(seconds=config['SYNC_LAG_SECONDS'])
+            ).values_list('id', 'latitude', 'longitude', 'average_rating', 'is_verified')
+            for provider_id, latitude, longitude, rating, verified in changed:
+                self.update(str(provider_id), latitude, longitude, rating, verified)
+            self._synced_at = started_at
+
+    def update(self, provider_id, latitude, longitude, rating, verified):
+        """
+        Insert or update one provider.
+        """
+        if latitude is None or longitude is None:
+            latitude = longitude = np.nan
+
+        with self._lock:
+            slot = self._slots.get(provider_id)
+            if slot is None:
+                slot = self._allocate()
+                self._slots[provider_id] = slot
+                self._ids[slot] = provider_id
+                self._used[slot] = True
+            self._lat[slot] = latitude
+            self._lon[slot] = longitude
+            self._rating[slot] = float(rating)
+            self._verified[slot] = verified
+            self._mark_dirty(slot)
+
+    def update_from_instance(self, provider):
+        self.update(
+            str(provider.pk),
+            provider.latitude,
+            provider.longitude,
+            provider.average_rating,
+            provider.is_verified,
+        )
+
+    def remove(self, provider_id):
+        with self._lock:
+            slot = self._slots.pop(provider_id, None)
+            if slot is None:
+                return
+            self._used[slot] = False
+            self._verified[slot] = False
+            self._ids[slot] = None
+            self._free.append(slot)
+
+    def _allocate(self):
+        if self._free:
+            return self._free.pop()
+        if self._size == len(self._ids):
+            self._grow(len(self._ids) * 2)
+        slot = self._size
+        self._size += 1
+        return slot
+
+    def _grow(self, capacity):
+        for name in ('_ids', '_lat', '_lon', '_rating', '_verified', '_used'):
+            array = getattr(self, name)
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            grown[len(array):] = None if array.dtype == object else 0
+            setattr(self, name, grown)
+
+    def _mark_dirty(self, slot):
+        self._dirty.add(slot)
+        if len(self._dirty) > max(1024, self._size // 100):
+            self._reindex()
+
+    # Grid
+
+    def _cell_keys(self, latitudes, longitudes):
+        rows = np.floor((np.asarray(latitudes) + 90) / self.cell_degrees).astype(np.int64)
+        columns = np.floor((np.asarray(longitudes) + 180) / self.cell_degrees).astype(np.int64)
+        return rows * self.columns + columns
+
+    def _reindex(self):
+        located = self._used[:self._size] & np.isfinite(self._lat[:self._size])
+        slots = np.flatnonzero(located)
+        keys = self._cell_keys(self._lat[slots], self._lon[slots])
+        order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[order]
+        self._sorted_slots = slots[order]
+        self._dirty = set()
+
+    def _candidates(self, latitude, longitude, radius_km):
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+        first_row, first_column = (
+            int((min_lat + 90) // self.cell_degrees), int((min_lon + 180) // self.cell_degrees)
+        )
+        last_row, last_column = (
+            int((max_lat + 90) // self.cell_degrees), int((max_lon + 180) // self.cell_degrees)
+        )
+
+        # Each grid row of the box is one contiguous run of cell keys
+        row_keys = np.arange(first_row, last_row + 1, dtype=np.int64) * self.columns
+        starts = np.searchsorted(self._sorted_keys, row_keys + first_column, side='left')
+        ends = np.searchsorted(self._sorted_keys, row_keys + last_column, side='right')
+        parts = [self._sorted_slots[start:end] for start, end in zip(starts, ends) if end > start]
+        if self._dirty:
+            parts.append(np.fromiter(self._dirty, dtype=np.int64, count=len(self._dirty)))
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        # A dirty slot may also still sit in the sorted grid
+        return np.unique(np.concatenate(parts)) if self._dirty else np.concatenate(parts)
+
+    # Queries
+
+    def _distances(self, latitude, longitude, slots):
+        lat1, lon1 = np.radians(latitude), np.radians(longitude)
+        lat2, lon2 = np.radians(self._lat[slots]), np.radians(self._lon[slots])
+        a = (
+            np.sin((lat2 - lat1) / 2) ** 2
+            + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+    def _query(self, latitude, longitude, radius_km, verified_only):
+        slots = self._candidates(latitude, longitude, radius_km)
+        mask = self._verified[slots] if verified_only else self._used[slots]
+        slots = slots[mask]
+        distances = self._distances(latitude, longitude, slots)
+        within = distances <= radius_km
+        return slots[within], distances[within]
+
+    def _results(self, slots, distances):
+        return [
+            LocatedProvider(self._ids[slot], float(distance), float(self._rating[slot]))
+            for slot, distance in zip(slots, distances)
+        ]
+
+    def ratings(self, provider_ids):
+        """
+        Ratings of the verified providers among provider_ids.
+
+        :return: Dict of provider id to average rating.
+        """
+        if self.auto_sync:
+            self.sync()
+        with self._lock:
+            ratings = {}
+            for provider_id in provider_ids:
+                slot = self._slots.get(provider_id)
+                if slot is not None and self._verified[slot]:
+                    ratings[provider_id] = float(self._rating[slot])
+            return ratings
+
+    def within_radius(self, latitude, longitude, radius_km, verified_only=True):
+        """
+        Providers within radius_km of a point, nearest first.
+
+        :return: List of LocatedProvider.
+        """
+        if self.auto_sync:
+            self.sync()
+        with self._lock:
+            slots, distances = self._query(latitude, longitude, radius_km, verified_only)
+            order = np.argsort(distances)
+            return self._results(slots[order], distances[order])
+
+    def nearest(self, latitude, longitude, k=10, verified_only=True, max_radius_km=None):
+        """
+        The k nearest providers to a point, searching outwards from a small
+        radius until k are found or max_radius_km is reached.
+
+        :return: List of up to k LocatedProvider, nearest first.
+        """
+        if self.auto_sync:
+            self.sync()
+        radius_km = settings.PROVIDER_LOCATOR['START_RADIUS_KM']
+        max_radius_km = max_radius_km or settings.PROVIDER_SEARCH['MAX_RADIUS_KM']
+        with self._lock:
+            while True:
+                slots, distances = self._query(latitude, longitude, radius_km, verified_only)
+                if len(slots) >= k or radius_km >= max_radius_km:
+                    break
+                radius_km = min(radius_km * 2, max_radius_km)
+
+            if len(slots) > k:
+                nearest = np.argpartition(distances, k - 1)[:k]
+                slots, distances = slots[nearest], distances[nearest]
+            order = np.argsort(distances)
+            return self._results(slots[order], distances[order])
+
+
+provider_locator = ProviderLocator()
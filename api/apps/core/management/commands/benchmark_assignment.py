@@ -0,0 +1,98 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from apps.core.services.dispatch import DispatchService
+from utilities.assignment import AUCTION, HUNGARIAN
+
+# Synthetic jobs and providers are spread over Lagos
+LATITUDE_RANGE = (6.35, 6.75)
+LONGITUDE_RANGE = (3.05, 3.65)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare batch job assignment by the Hungarian and auction algorithms "
+        "against greedy nearest-provider assignment on synthetic data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=1000)
+        parser.add_argument("--providers", type=int, default=1000)
+        parser.add_argument(
+            "--hotspots",
+            type=int,
+            default=5,
+            help="Number of demand hotspots, 0 spreads jobs evenly",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        jobs, providers = options["jobs"], options["providers"]
+
+        # Demand is concentrated in a few hotspots, providers are spread out
+        if options["hotspots"]:
+            hotspots = np.column_stack(
+                [
+                    rng.uniform(*LATITUDE_RANGE, options["hotspots"]),
+                    rng.uniform(*LONGITUDE_RANGE, options["hotspots"]),
+                ]
+            )
+            job_positions = hotspots[rng.integers(0, len(hotspots), jobs)]
+            job_positions = job_positions + rng.normal(0, 0.03, (jobs, 2))
+        else:
+            job_positions = np.column_stack(
+                [rng.uniform(*LATITUDE_RANGE, jobs), rng.uniform(*LONGITUDE_RANGE, jobs)]
+            )
+        provider_positions = np.column_stack(
+            [rng.uniform(*LATITUDE_RANGE, providers), rng.uniform(*LONGITUDE_RANGE, providers)]
+        )
+        ratings = rng.uniform(3, 5, providers)
+        loads = rng.integers(0, 3, providers)
+
+        start = time.perf_counter()
+        cost = DispatchService.cost_matrix(job_positions, provider_positions, ratings, loads)
+        self.stdout.write(
+            f"cost matrix {cost.shape[0]}x{cost.shape[1]} "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+
+        defer_cost = DispatchService.defer_cost()
+        for label, solve in (
+            ("greedy", self.greedy),
+            (HUNGARIAN, lambda cost: DispatchService.solve(cost, method=HUNGARIAN)[:2]),
+            (AUCTION, lambda cost: DispatchService.solve(cost, method=AUCTION)[:2]),
+        ):
+            start = time.perf_counter()
+            rows, columns = solve(cost)
+            elapsed = time.perf_counter() - start
+            again = solve(cost)
+            deterministic = np.array_equal(rows, again[0]) and np.array_equal(columns, again[1])
+
+            pair_costs = cost[rows, columns]
+            allowed = pair_costs < defer_cost
+            total = pair_costs[allowed].sum() + defer_cost * (jobs - allowed.sum())
+            self.stdout.write(
+                f"{label:<10} {elapsed * 1000:8.0f} ms  total cost {total:10.1f}"
+                f"  assigned {allowed.sum():5d}/{jobs}"
+                f"  mean cost {pair_costs[allowed].mean():6.2f}"
+                f"  deterministic {'yes' if deterministic else 'NO'}"
+            )
+
+    @staticmethod
+    def greedy(cost):
+        """
+        Each job in arrival order takes its cheapest provider still free.
+        """
+        taken = np.zeros(cost.shape[1], dtype=bool)
+        rows, columns = [], []
+        for row in range(cost.shape[0]):
+            if taken.all():
+                break
+            column = int(np.argmin(np.where(taken, np.inf, cost[row])))
+            taken[column] = True
+            rows.append(row)
+            columns.append(column)
+        return np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64)
@@ -0,0 +1,92 @@
+import os
+import random
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from utilities.images import generate_variants
+
+# (size, JPEG quality) of typical uploads: client-resized photos and the odd
+# straight-from-camera one
+CLIENT_RESIZED = ((800, 600), 80)
+CAMERA_ORIGINAL = ((4032, 3024), 92)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the profile photo pipeline over a corpus of uploads with and "
+        "without the as-is fast path for already optimized JPEGs"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--corpus", help="Directory of sample uploads; synthetic if omitted"
+        )
+        parser.add_argument("--count", type=int, default=100)
+        parser.add_argument(
+            "--camera-ratio",
+            type=float,
+            default=0.1,
+            help="Share of synthetic uploads that are full camera originals",
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            if options["corpus"]:
+                corpus = options["corpus"]
+                paths = sorted(
+                    os.path.join(corpus, name) for name in os.listdir(corpus)
+                )
+            else:
+                paths = self.write_corpus(
+                    directory, options["count"], options["camera_ratio"]
+                )
+
+            config = settings.PROFILE_PHOTOS
+            total_bytes = sum(os.path.getsize(path) for path in paths)
+            self.stdout.write(
+                f"Corpus: {len(paths)} files, {total_bytes / 1024 / 1024:.1f} MB"
+            )
+
+            for label, max_bytes in (
+                ("always re-encode", None),
+                ("as-is fast path", config["AS_IS_MAX_BYTES"]),
+            ):
+                kept = 0
+                start = time.perf_counter()
+                for path in paths:
+                    with open(path, "rb") as stream:
+                        upload = File(stream, name=os.path.basename(path))
+                        variants = generate_variants(
+                            upload,
+                            sizes=config["VARIANTS"],
+                            formats=config["FORMATS"],
+                            quality=config["QUALITY"],
+                            max_bytes=max_bytes,
+                        )
+                        primary = variants[next(iter(config["VARIANTS"]))]
+                        kept += primary[config["FORMATS"][0]] is upload
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{label:<17} {elapsed / len(paths) * 1000:7.1f} ms/upload, "
+                    f"{kept} kept as is"
+                )
+
+    def write_corpus(self, directory, count, camera_ratio):
+        rng = random.Random(0)
+        paths = []
+        for i in range(count):
+            size, quality = (
+                CAMERA_ORIGINAL if rng.random() < camera_ratio else CLIENT_RESIZED
+            )
+            # Noise upscaled to a photo-like gradient, cheap at any size
+            noise = Image.effect_noise((size[0] // 16, size[1] // 16), 48)
+            sample = Image.merge("RGB", (noise, noise.rotate(180), noise.transpose(0)))
+            path = os.path.join(directory, f"upload_{i}.jpg")
+            sample.resize(size, Image.BILINEAR).save(path, "JPEG", quality=quality)
+            paths.append(path)
+        return paths
@@ -0,0 +1,119 @@
+import time
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.core.choices import SERVICE_PROVIDER
+from apps.core.locator import ProviderLocator
+from apps.core.models import ServiceProviderProfile
+from apps.core.services.provider import ProviderSearchService
+from utilities.geo import geohash_encode
+
+User = get_user_model()
+
+# Synthetic providers are spread over Lagos
+LATITUDE_RANGE = (6.35, 6.75)
+LONGITUDE_RANGE = (3.05, 3.65)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare k-nearest provider queries on the in-memory ProviderLocator "
+        "against the indexed SQL search. SQL rows are created in a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+        )
+        parser.add_argument("--queries", type=int, default=1000)
+        parser.add_argument("--k", type=int, default=10)
+        parser.add_argument(
+            "--sql-max",
+            type=int,
+            default=100_000,
+            help="Skip the SQL path above this many providers",
+        )
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        k = options["k"]
+        points = np.column_stack(
+            [
+                rng.uniform(*LATITUDE_RANGE, options["queries"]),
+                rng.uniform(*LONGITUDE_RANGE, options["queries"]),
+            ]
+        )
+
+        for size in options["sizes"]:
+            latitudes = rng.uniform(*LATITUDE_RANGE, size)
+            longitudes = rng.uniform(*LONGITUDE_RANGE, size)
+            bookable = rng.random(size) < 0.5
+
+            locator = ProviderLocator(auto_sync=False)
+            start = time.perf_counter()
+            locator.bulk_load(
+                [str(i) for i in range(size)],
+                latitudes,
+                longitudes,
+                rng.uniform(1, 5, size),
+                bookable,
+            )
+            load = time.perf_counter() - start
+            self.report(size, "locator", points, lambda lat, lon: locator.nearest(lat, lon, k=k))
+            self.stdout.write(f"{'':>9} locator load {load * 1000:.0f} ms")
+
+            if size > options["sql_max"]:
+                self.stdout.write(f"{size:>9} sql      skipped (--sql-max)")
+                continue
+            with transaction.atomic():
+                self.create_providers(latitudes, longitudes, bookable)
+                self.report(
+                    size,
+                    "sql",
+                    points,
+                    lambda lat, lon: ProviderSearchService.nearest_in_database(lat, lon, k=k),
+                )
+                transaction.set_rollback(True)
+
+    def report(self, size, label, points, query):
+        start = time.perf_counter()
+        for latitude, longitude in points:
+            query(float(latitude), float(longitude))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{size:>9} {label:<8} {elapsed / len(points) * 1000:8.3f} ms/query "
+            f"{len(points) / elapsed:10.0f} queries/s"
+        )
+
+    def create_providers(self, latitudes, longitudes, bookable, batch_size=5000):
+        for start in range(0, len(latitudes), batch_size):
+            users = User.objects.bulk_create(
+                [
+                    User(
+                        full_name=f"Provider {i}",
+                        email=f"benchmark-provider-{i}@example.com",
+                        phone_number=f"+1{i:010d}",
+                        user_type=SERVICE_PROVIDER,
+                        password="!",
+                    )
+                    for i in range(start, min(start + batch_size, len(latitudes)))
+                ]
+            )
+            ServiceProviderProfile.objects.bulk_create(
+                [
+                    ServiceProviderProfile(
+                        user=user,
+                        business_name=user.full_name,
+                        latitude=latitudes[i],
+                        longitude=longitudes[i],
+                        geohash=geohash_encode(latitudes[i], longitudes[i]),
+                        is_available=bool(bookable[i]),
+                        is_verified=bool(bookable[i]),
+                    )
+                    for i, user in enumerate(users, start=start)
+                ]
+            )
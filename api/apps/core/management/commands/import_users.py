@@ -0,0 +1,291 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import islice
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from apps.core.choices import CUSTOMER, SERVICE_PROVIDER
+from apps.core.managers.service_area import (
+    clean_service_area_name,
+    service_area_key,
+    split_service_areas,
+)
+from apps.core.models import CustomerProfile, ServiceArea, ServiceProviderProfile
+
+User = get_user_model()
+
+
+def _init_worker():
+    # Needed when workers are spawned rather than forked
+    django.setup()
+
+
+def _hash_password(raw_password):
+    return make_password(raw_password or None)
+
+
+def _read_records(path, file_format):
+    with open(path, newline="", encoding="utf-8") as stream:
+        if file_format == "csv":
+            yield from csv.DictReader(stream)
+        else:
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import customers and service providers from a CSV or JSONL file. "
+        "Passwords are hashed in a process pool and rows are inserted with "
+        "bulk_create; the import can be resumed from its checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL file to import")
+        parser.add_argument(
+            "--format", choices=["csv", "jsonl"], help="Defaults to the file extension"
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="Hashing processes"
+        )
+        parser.add_argument(
+            "--checkpoint", help="Checkpoint file, defaults to <path>.checkpoint"
+        )
+        parser.add_argument(
+            "--resume", action="store_true", help="Skip records already imported"
+        )
+        parser.add_argument(
+            "--duplicates-report", help="Write rejected records to this CSV file"
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+        file_format = options["format"] or (
+            "jsonl" if path.endswith((".jsonl", ".json")) else "csv"
+        )
+        checkpoint_path = options["checkpoint"] or f"{path}.checkpoint"
+        chunk_size = options["chunk_size"]
+
+        processed = 0
+        if options["resume"] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as stream:
+                processed = json.load(stream)["processed"]
+            self.stdout.write(f"Resuming after {processed} records.")
+
+        self.workers = options["workers"]
+        self.rejected = []
+        self.created = 0
+        records = islice(_read_records(path, file_format), processed, None)
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker
+        ) as executor:
+            self.executor = executor
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+
+                self.import_chunk(list(enumerate(chunk, start=processed + 1)))
+                processed += len(chunk)
+                with open(checkpoint_path, "w") as stream:
+                    json.dump({"path": path, "processed": processed}, stream)
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{processed} processed, {self.created} created, "
+                    f"{len(self.rejected)} rejected ({self.created / elapsed:.0f} users/s)"
+                )
+
+        if options["duplicates_report"] and self.rejected:
+            with open(options["duplicates_report"], "w", newline="") as stream:
+                writer = csv.writer(stream)
+                writer.writerow(["line", "email", "phone_number", "reason"])
+                writer.writerows(self.rejected)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Import finished: {self.created} users created, "
+                f"{len(self.rejected)} records rejected."
+            )
+        )
+
+    def import_chunk(self, chunk):
+        records = self.filter_duplicates(chunk)
+        if not records:
+            return
+
+        hashes = list(
+            self.executor.map(
+                _hash_password,
+                [record.get("password") for _, record in records],
+                chunksize=max(1, len(records) // (self.workers * 4)),
+            )
+        )
+        try:
+            self.insert(records, hashes)
+        except IntegrityError:
+            # A concurrent signup took an email or phone number since the check
+            self.stdout.write(
+                self.style.WARNING("Conflict while inserting, re-checking chunk.")
+            )
+            hashes_by_line = {line: h for (line, _), h in zip(records, hashes)}
+            for line, record in self.filter_duplicates(records):
+                self.insert_one(line, record, hashes_by_line[line])
+
+    def insert_one(self, line, record, password_hash):
+        """
+        Insert a single record, rejecting it as a duplicate if its email or
+        phone number was taken since it was checked.
+        """
+        try:
+            self.insert([(line, record)], [password_hash])
+        except IntegrityError:
+            # Still racing: report the reason if the other row is visible by now
+            if self.filter_duplicates([(line, record)]):
+                self.rejected.append(
+                    (
+                        line,
+                        record["email"],
+                        record["phone_number"],
+                        "duplicate email or phone_number",
+                    )
+                )
+
+    def filter_duplicates(self, chunk):
+        """
+        Drop invalid records and records whose email or phone number is already
+        taken, in the database or earlier in the chunk, using one query per chunk.
+
+        :param chunk: List of (line number, record) pairs.
+        :return: The accepted (line number, record) pairs.
+        """
+        for _, record in chunk:
+            record["email"] = User.objects.normalize_email(record.get("email") or "")
+            record["phone_number"] = (record.get("phone_number") or "").strip()
+
+        emails = {record["email"] for _, record in chunk}
+        phone_numbers = {record["phone_number"] for _, record in chunk}
+        taken_emails, taken_phone_numbers = set(), set()
+        for email, phone_number in User.objects.filter(
+            Q(email__in=emails) | Q(phone_number__in=phone_numbers)
+        ).values_list("email", "phone_number"):
+            taken_emails.add(email)
+            taken_phone_numbers.add(phone_number)
+
+        accepted = []
+        for line, record in chunk:
+            email, phone_number = record["email"], record["phone_number"]
+            user_type = record.setdefault("user_type", CUSTOMER)
+            reason = None
+            if not email or not phone_number or not record.get("full_name"):
+                reason = "missing full_name, email or phone_number"
+            elif user_type not in (CUSTOMER, SERVICE_PROVIDER):
+                reason = "invalid user_type"
+            elif user_type == CUSTOMER and not self.parse_date(record):
+                reason = "missing or invalid date_of_birth"
+            elif email in taken_emails:
+                reason = "duplicate email"
+            elif phone_number in taken_phone_numbers:
+                reason = "duplicate phone_number"
+
+            if reason:
+                self.rejected.append((line, email, phone_number, reason))
+                continue
+
+            taken_emails.add(email)
+            taken_phone_numbers.add(phone_number)
+            accepted.append((line, record))
+        return accepted
+
+    @staticmethod
+    def parse_date(record):
+        value = record.get("date_of_birth")
+        if isinstance(value, date):
+            return value
+        try:
+            record["date_of_birth"] = date.fromisoformat(value)
+        except (TypeError, ValueError):
+            return None
+        return record["date_of_birth"]
+
+    def insert(self, records, password_hashes):
+        users, customers, providers = [], [], []
+        area_names = {}
+        for (line, record), password_hash in zip(records, password_hashes):
+            user_type = record["user_type"]
+            user = User(
+                full_name=record["full_name"],
+                email=record["email"],
+                phone_number=record["phone_number"],
+                user_type=user_type,
+                password=password_hash,
+            )
+            users.append(user)
+
+            if user_type == CUSTOMER:
+                customer = CustomerProfile(user=user, date_of_birth=record["date_of_birth"])
+                customers.append(customer)
+                # CSV rows carry "Ikeja, Yaba", JSON Lines records may carry a list
+                names = record.get("preferred_service_areas") or []
+                if isinstance(names, str):
+                    names = split_service_areas(names)
+                else:
+                    names = [clean_service_area_name(name) for name in names if name.strip()]
+                if names:
+                    area_names[customer.pk] = names
+            else:
+                providers.append(
+                    ServiceProviderProfile(
+                        user=user,
+                        business_name=record.get("business_name", ""),
+                        is_business=str(record.get("is_business", "")).lower()
+                        in ("1", "true", "yes"),
+                    )
+                )
+
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            CustomerProfile.objects.bulk_create(customers)
+            ServiceProviderProfile.objects.bulk_create(providers)
+            self.link_service_areas(area_names)
+        self.created += len(users)
+
+    @staticmethod
+    def link_service_areas(area_names):
+        """
+        Link new customers to their service areas, resolving every name in
+        the batch at once.
+
+        :param area_names: Dict of customer profile pk to area names.
+        """
+        if not area_names:
+            return
+        areas = ServiceArea.objects.by_key(
+            name for names in area_names.values() for name in names
+        )
+        Link = CustomerProfile.service_areas.through
+        Link.objects.bulk_create(
+            [
+                Link(customerprofile_id=customer_pk, servicearea_id=area_pk)
+                for customer_pk, names in area_names.items()
+                for area_pk in {
+                    areas[key].pk for key in map(service_area_key, names) if key in areas
+                }
+            ],
+            ignore_conflicts=True,
+        )
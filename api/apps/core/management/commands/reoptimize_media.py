@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.core.choices import PHOTO_PENDING
+from apps.core.management.photo_workers import init_worker, optimize
+from apps.core.models import CustomerProfile, ServiceProviderProfile
+from apps.core.services.photo import (
+    AS_IS,
+    FAILED,
+    OPTIMIZED,
+    REUSED,
+)
+
+MODELS = {
+    "customers": CustomerProfile,
+    "providers": ServiceProviderProfile,
+}
+
+
+def iter_stale_photos(model, batch_size, force=False):
+    """
+    Yield (model label, pk, photo name) for every photo not produced by the
+    current pipeline version, one keyset-paginated batch at a time.
+    """
+    queryset = model.objects.exclude(profile_photo="").exclude(
+        profile_photo__isnull=True
+    ).exclude(profile_photo_status=PHOTO_PENDING)
+    if not force:
+        queryset = queryset.filter(
+            Q(profile_photo_version__isnull=True)
+            | Q(profile_photo_version__lt=settings.PROFILE_PHOTOS["VERSION"])
+        )
+
+    last_pk = None
+    while True:
+        batch = queryset.order_by("pk")
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        batch = list(batch.values_list("pk", "profile_photo")[:batch_size])
+        if not batch:
+            return
+        for pk, photo_name in batch:
+            yield model._meta.label, str(pk), photo_name
+        last_pk = batch[-1][0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-encode existing customer and provider profile photos into the "
+        "current optimized variants, in a process pool. Safe to run while "
+        "the site is live; photos already at the current version are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="Encoding processes"
+        )
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--models", nargs="+", choices=list(MODELS), default=list(MODELS)
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-encode photos already at the current version",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        counts = {OPTIMIZED: 0, AS_IS: 0, REUSED: 0, FAILED: 0, "other": 0}
+        original_bytes = optimized_bytes = 0
+        start = time.perf_counter()
+
+        # Spawned rather than forked, so workers never inherit the parent's
+        # open database connection. The worker functions live in a module
+        # without model imports, since spawned workers import it before setup
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+        ) as executor:
+            for key in options["models"]:
+                jobs = iter_stale_photos(MODELS[key], batch_size, options["force"])
+                while True:
+                    batch = [job for _, job in zip(range(batch_size), jobs)]
+                    if not batch:
+                        break
+
+                    for result in executor.map(optimize, batch):
+                        outcome = result["outcome"]
+                        counts[outcome if outcome in counts else "other"] += 1
+                        original_bytes += result["original_size"]
+                        optimized_bytes += result["optimized_size"]
+                    self.report(key, counts, original_bytes, optimized_bytes, start)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done: {counts[OPTIMIZED]} optimized, {counts[AS_IS]} kept as is, "
+                f"{counts[REUSED]} reused, "
+                f"{counts[FAILED]} failed, {counts['other']} skipped."
+            )
+        )
+
+    def report(self, key, counts, original_bytes, optimized_bytes, start):
+        elapsed = time.perf_counter() - start
+        processed = sum(counts.values())
+        saved_mb = (original_bytes - optimized_bytes) / 1024 / 1024
+        self.stdout.write(
+            f"[{key}] {processed} photos in {elapsed:.1f}s "
+            f"({processed / elapsed:.1f} photos/s, "
+            f"{original_bytes / 1024 / 1024 / elapsed:.1f} MB/s read), "
+            f"{saved_mb:.1f} MB saved"
+        )
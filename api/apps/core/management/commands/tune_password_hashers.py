@@ -0,0 +1,118 @@
+import os
+import time
+
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    BCryptSHA256PasswordHasher,
+    PBKDF2PasswordHasher,
+)
+from django.core.management.base import BaseCommand
+
+SAMPLE_PASSWORD = "correct horse battery staple"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark PBKDF2, Argon2 and bcrypt on this host and print the work "
+        "factors that hash a password in about the target time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            default=250.0,
+            help="Target time for one hash, in milliseconds",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=3,
+            help="Hashes timed per measurement; the fastest one is used",
+        )
+
+    def handle(self, *args, **options):
+        self.target = options["target_ms"] / 1000
+        self.samples = options["samples"]
+
+        recommendations = {}
+        recommendations.update(self.tune_pbkdf2())
+        recommendations.update(self.tune_argon2())
+        recommendations.update(self.tune_bcrypt())
+
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS("Recommended environment settings:"))
+        for name, value in recommendations.items():
+            self.stdout.write(f"PASSWORD_{name}={value}")
+
+    def measure(self, hasher):
+        salt = hasher.salt()
+        timings = []
+        for _ in range(self.samples):
+            start = time.perf_counter()
+            hasher.encode(SAMPLE_PASSWORD, salt)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def report(self, name, params, seconds):
+        self.stdout.write(f"{name:<8} {params:<40} {seconds * 1000:8.1f} ms")
+
+    def tune_pbkdf2(self):
+        hasher = PBKDF2PasswordHasher()
+
+        # PBKDF2 cost is linear in the iteration count, so one probe is enough
+        hasher.iterations = 100_000
+        probe = self.measure(hasher)
+        hasher.iterations = max(
+            10_000, round(100_000 * self.target / probe / 10_000) * 10_000
+        )
+        self.report("PBKDF2", f"iterations={hasher.iterations}", self.measure(hasher))
+        return {"PBKDF2_ITERATIONS": hasher.iterations}
+
+    def tune_argon2(self):
+        hasher = Argon2PasswordHasher()
+        try:
+            hasher._load_library()
+        except ValueError:
+            self.stdout.write(self.style.WARNING("Argon2   skipped, argon2-cffi missing"))
+            return {}
+
+        hasher.parallelism = os.cpu_count() or 1
+        best = None
+        for time_cost in range(1, 11):
+            hasher.time_cost = time_cost
+            seconds = self.measure(hasher)
+            self.report(
+                "Argon2",
+                f"time_cost={time_cost} memory_cost={hasher.memory_cost} "
+                f"parallelism={hasher.parallelism}",
+                seconds,
+            )
+            if seconds > self.target and best is not None:
+                break
+            best = time_cost
+
+        return {
+            "ARGON2_TIME_COST": best,
+            "ARGON2_MEMORY_COST": hasher.memory_cost,
+            "ARGON2_PARALLELISM": hasher.parallelism,
+        }
+
+    def tune_bcrypt(self):
+        hasher = BCryptSHA256PasswordHasher()
+        try:
+            hasher._load_library()
+        except ValueError:
+            self.stdout.write(self.style.WARNING("bcrypt   skipped, bcrypt missing"))
+            return {}
+
+        best = None
+        for rounds in range(10, 17):
+            hasher.rounds = rounds
+            seconds = self.measure(hasher)
+            self.report("bcrypt", f"rounds={rounds}", seconds)
+            if seconds > self.target and best is not None:
+                break
+            best = rounds
+
+        return {"BCRYPT_ROUNDS": best}
@@ -0,0 +1,18 @@
+"""
+Process pool entry points for reoptimize_media.
+
+Spawned workers import this module before Django is set up, so it must not
+import models or anything that does; they are imported inside the functions.
+"""
+import django
+
+
+def init_worker():
+    django.setup()
+
+
+def optimize(job):
+    from apps.core.services.photo import ProfilePhotoService
+
+    model, profile_id, photo_name = job
+    return ProfilePhotoService.optimize(model, profile_id, photo_name)
@@ -1 +1,2 @@
-from .account import *
\ No newline at end of file
+from .account import *
+from .service_area import *
@@ -1,4 +1,5 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 
 
@@ -23,6 +24,23 @@ class CustomUserManager(BaseUserManager):
         email = self.normalize_email(email)
         return email
 
+    def credential_conflicts(self, email, phone_number):
+        """
+        Return field errors for an email and phone number that are already
+        taken, using a single query.
+        """
+        email = self.normalize_email(email)
+        conflicts = {}
+        existing = self.filter(Q(email=email) | Q(phone_number=phone_number)).values_list(
+            "email", "phone_number"
+        )[:2]
+        for existing_email, existing_phone_number in existing:
+            if existing_email == email:
+                conflicts["email"] = [_("Email is already in use.")]
+            if existing_phone_number == phone_number:
+                conflicts["phone_number"] = [_("Phone number is already in use.")]
+        return conflicts
+
     def _create_user(self, full_name, email, phone_number, password, **extra_fields):
         """
         Create and save a user with the given email and password.
@@ -0,0 +1,83 @@
+from django.db import models
+from django.utils.text import slugify
+
+# max_length of ServiceArea.name and slug
+MAX_NAME_LENGTH = 100
+
+
+def service_area_key(name):
+    """
+    Canonical lookup key for an area name, so "Victoria  Island" and
+    "victoria island" resolve to the same area.
+    """
+    return slugify(name)
+
+
+def clean_service_area_name(name):
+    """
+    Collapse whitespace and cut a name down to MAX_NAME_LENGTH, so free text
+    from old rows or imports always fits a ServiceArea.
+    """
+    return " ".join(name.split())[:MAX_NAME_LENGTH].rstrip()
+
+
+def split_service_areas(text):
+    """
+    Split legacy comma-separated service areas into clean names.
+    """
+    return [clean_service_area_name(name) for name in (text or "").split(",") if name.strip()]
+
+
+class ServiceAreaManager(models.Manager):
+
+    def resolve(self, names, create=True):
+        """
+        Map free-text area names to areas by canonical key or alias.
+
+        :param names: Iterable of area names.
+        :param create: Create areas for names that match nothing.
+        :return: List of distinct areas, in the order the names were given.
+        """
+        resolved = []
+        for area in self.by_key(names, create=create).values():
+            if area not in resolved:
+                resolved.append(area)
+        return resolved
+
+    def by_key(self, names, create=True):
+        """
+        Look up areas for free-text names in two queries, matching the
+        canonical key of each name against area slugs, then alias slugs.
+        Unknown names become new areas unless create is False.
+
+        :param names: Iterable of area names.
+        :param create: Create areas for names that match nothing.
+        :return: Dict of service_area_key(name) to area, in name order.
+        """
+        from apps.core.models import ServiceAreaAlias
+
+        names_by_key = {}
+        for name in names:
+            name = clean_service_area_name(name)
+            key = service_area_key(name)
+            if key:
+                names_by_key.setdefault(key, name)
+        if not names_by_key:
+            return {}
+
+        areas = {area.slug: area for area in self.filter(slug__in=names_by_key)}
+        aliased = ServiceAreaAlias.objects.filter(
+            slug__in=names_by_key.keys() - areas.keys()
+        ).select_related("area")
+        areas.update({alias.slug: alias.area for alias in aliased})
+
+        missing = names_by_key.keys() - areas.keys()
+        if missing and create:
+            # A concurrent request may create the same area, so refetch
+            self.bulk_create(
+                [self.model(name=names_by_key[key], slug=key) for key in missing],
+                ignore_conflicts=True,
+            )
+            areas.update({area.slug: area for area in self.filter(slug__in=missing)})
+
+        return {key: areas[key] for key in names_by_key if key in areas}
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_group_rename_isdefault_address_is_default_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="token_epoch",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Incremented to revoke every token issued to the user",
+            ),
+        ),
+    ]
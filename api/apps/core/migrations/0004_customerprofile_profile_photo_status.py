@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+def mark_existing_photos_ready(apps, schema_editor):
+    # Photos uploaded before this migration were optimized on save
+    CustomerProfile = apps.get_model("core", "CustomerProfile")
+    CustomerProfile.objects.exclude(profile_photo="").exclude(
+        profile_photo__isnull=True
+    ).update(profile_photo_status="ready")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_user_token_epoch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customerprofile",
+            name="profile_photo_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("pending", "Pending"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                help_text="State of the background optimization of the profile photo",
+                max_length=10,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(mark_existing_photos_ready, migrations.RunPython.noop),
+    ]
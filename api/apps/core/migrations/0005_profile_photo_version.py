@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+def mark_existing_provider_photos_ready(apps, schema_editor):
+    # Served as uploaded until reoptimize_media processes them
+    ServiceProviderProfile = apps.get_model("core", "ServiceProviderProfile")
+    ServiceProviderProfile.objects.exclude(profile_photo="").exclude(
+        profile_photo__isnull=True
+    ).update(profile_photo_status="ready")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_customerprofile_profile_photo_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customerprofile",
+            name="profile_photo_version",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="Version of the optimization pipeline that produced the stored photo",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="serviceproviderprofile",
+            name="profile_photo_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("pending", "Pending"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                help_text="State of the background optimization of the profile photo",
+                max_length=10,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="serviceproviderprofile",
+            name="profile_photo_version",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="Version of the optimization pipeline that produced the stored photo",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(
+            mark_existing_provider_photos_ready, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+from utilities.geo import geohash_encode
+
+BATCH_SIZE = 1000
+
+
+def backfill_geohash(apps, schema_editor):
+    ServiceProviderProfile = apps.get_model("core", "ServiceProviderProfile")
+    providers = ServiceProviderProfile.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).only("pk", "latitude", "longitude").order_by("pk")
+
+    # Keyset batches, so writes never interleave with an open cursor
+    last_pk = None
+    while True:
+        batch = providers if last_pk is None else providers.filter(pk__gt=last_pk)
+        batch = list(batch[:BATCH_SIZE])
+        if not batch:
+            break
+        for provider in batch:
+            provider.geohash = geohash_encode(provider.latitude, provider.longitude)
+        ServiceProviderProfile.objects.bulk_update(batch, ["geohash"])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_profile_photo_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="serviceproviderprofile",
+            name="geohash",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Geohash of latitude and longitude, kept in sync on save",
+                max_length=12,
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="serviceproviderprofile",
+            index=models.Index(
+                condition=models.Q(("is_available", True), ("is_verified", True)),
+                fields=["geohash"],
+                name="provider_bookable_geohash_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
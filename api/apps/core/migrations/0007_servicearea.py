@@ -0,0 +1,172 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:20
+
+import uuid
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+from apps.core.managers.service_area import service_area_key, split_service_areas
+
+BATCH_SIZE = 1000
+
+
+def link_service_areas(apps, schema_editor):
+    CustomerProfile = apps.get_model("core", "CustomerProfile")
+    ServiceArea = apps.get_model("core", "ServiceArea")
+    Link = CustomerProfile.service_areas.through
+    customers = CustomerProfile.objects.exclude(preferred_service_areas="").only(
+        "pk", "preferred_service_areas"
+    ).order_by("pk")
+    area_ids = {}
+
+    # Keyset batches; one query for new areas and one for links per batch
+    last_pk = None
+    while True:
+        batch = customers if last_pk is None else customers.filter(pk__gt=last_pk)
+        batch = list(batch[:BATCH_SIZE])
+        if not batch:
+            break
+
+        names_by_customer = {
+            customer.pk: {
+                service_area_key(name): name
+                for name in split_service_areas(customer.preferred_service_areas)
+                if service_area_key(name)
+            }
+            for customer in batch
+        }
+        new_areas = {}
+        for names in names_by_customer.values():
+            for key, name in names.items():
+                if key not in area_ids:
+                    new_areas.setdefault(key, name)
+        if new_areas:
+            ServiceArea.objects.bulk_create(
+                [ServiceArea(name=name, slug=key) for key, name in new_areas.items()]
+            )
+            area_ids.update(
+                ServiceArea.objects.filter(slug__in=new_areas).values_list("slug", "pk")
+            )
+
+        Link.objects.bulk_create(
+            [
+                Link(customerprofile_id=customer_pk, servicearea_id=area_ids[key])
+                for customer_pk, names in names_by_customer.items()
+                for key in names
+            ],
+            ignore_conflicts=True,
+        )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_serviceproviderprofile_geohash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ServiceArea",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        db_index=True,
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("name", models.CharField(max_length=100)),
+                (
+                    "slug",
+                    models.SlugField(
+                        editable=False,
+                        help_text="Canonical lookup key, derived from the name",
+                        max_length=100,
+                        unique=True,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Service Area",
+                "verbose_name_plural": "Service Areas",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ServiceAreaAlias",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        db_index=True,
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Another spelling or name, e.g. 'VI'", max_length=100
+                    ),
+                ),
+                (
+                    "slug",
+                    models.SlugField(editable=False, max_length=100, unique=True),
+                ),
+                (
+                    "area",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="aliases",
+                        to="core.servicearea",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Service Area Alias",
+                "verbose_name_plural": "Service Area Aliases",
+            },
+        ),
+        migrations.AddField(
+            model_name="customerprofile",
+            name="service_areas",
+            field=models.ManyToManyField(
+                blank=True,
+                help_text="Areas the customer prefers to be served in",
+                related_name="customers",
+                to="core.servicearea",
+            ),
+        ),
+        migrations.AddField(
+            model_name="serviceproviderprofile",
+            name="service_areas",
+            field=models.ManyToManyField(
+                blank=True,
+                help_text="Areas the provider serves",
+                related_name="providers",
+                to="core.servicearea",
+            ),
+        ),
+        migrations.RunPython(link_service_areas, migrations.RunPython.noop),
+    ]
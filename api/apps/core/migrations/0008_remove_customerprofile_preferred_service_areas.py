@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_servicearea"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="customerprofile",
+            name="preferred_service_areas",
+        ),
+    ]
@@ -1,14 +1,18 @@
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin
+from django.conf import settings
 from django.core import validators
-from django.db import models
+from django.db import models, transaction
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from apps.common.models import BaseModel, ActiveBaseModel
+from apps.common.storage import DeduplicatedStorage
+from apps.common.revocation import TOKEN_EPOCH_CLAIM, session_epoch_store
 from apps.core.managers import CustomUserManager
-from apps.core.choices import USER_TYPES
+from apps.core.choices import USER_TYPES, PHOTO_STATUSES, PHOTO_PENDING, PHOTO_READY
 from utilities.general import validate_image_file
-from utilities.images import optimize_image
+from utilities.geo import geohash_encode
+from utilities.images import variant_name
 
 
 class User(AbstractBaseUser, ActiveBaseModel, PermissionsMixin):
@@ -30,6 +34,10 @@ class User(AbstractBaseUser, ActiveBaseModel, PermissionsMixin):
     phone_number_verified = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
     terms_accepted = models.BooleanField(default=False)
+    token_epoch = models.PositiveIntegerField(
+        default=0,
+        help_text="Incremented to revoke every token issued to the user"
+    )
 
     objects = CustomUserManager()
 
@@ -39,18 +47,157 @@ class User(AbstractBaseUser, ActiveBaseModel, PermissionsMixin):
     def __str__(self):
         return f"{self.email} ({self.user_type})"
 
+    def save(self, *args, **kwargs):
+        # A password change logs the user out everywhere
+        password_changed = self._password is not None and not self._state.adding
+        if password_changed:
+            self.token_epoch += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_epoch'}
+        super().save(*args, **kwargs)
+        if password_changed:
+            session_epoch_store.invalidate(self.pk)
+
+    def revoke_all_tokens(self):
+        """Invalidate every access and refresh token issued to this user so far."""
+        self.token_epoch = session_epoch_store.bump(self.pk)
+
     def tokens(self):
         refresh = RefreshToken.for_user(self)
+        refresh[TOKEN_EPOCH_CLAIM] = self.token_epoch
         return {
             'refresh': str(refresh),
             'access': str(refresh.access_token)
         }
 
 
-class CustomerProfile(BaseModel):
+class ProfilePhotoMixin(models.Model):
+    """
+    Background optimization state of a model's `profile_photo`. A new upload
+    is stored as is and replaced by its optimized variants by
+    apps.core.tasks.optimize_profile_photo.
+    """
+    profile_photo_status = models.CharField(
+        choices=PHOTO_STATUSES,
+        max_length=10,
+        null=True,
+        blank=True,
+        help_text="State of the background optimization of the profile photo"
+    )
+    profile_photo_version = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text="Version of the optimization pipeline that produced the stored photo"
+    )
+
+    class Meta:
+        abstract = True
+
+    def profile_photo_url(self):
+        if not self.profile_photo:
+            return None
+        # Never hand out the unoptimized original
+        if self.profile_photo_status != PHOTO_READY:
+            return settings.PROFILE_PHOTOS['PLACEHOLDER_URL']
+        return self.profile_photo.url
+
+    def profile_photo_urls(self):
+        """
+        URLs of every size and format of the profile photo, e.g.
+        {'thumb': {'jpeg': ..., 'webp': ...}, ...}.
+        """
+        if not self.profile_photo:
+            return None
+        placeholder = settings.PROFILE_PHOTOS['PLACEHOLDER_URL']
+        ready = self.profile_photo_status == PHOTO_READY
+        storage = self.profile_photo.storage
+
+        urls = {}
+        for (variant, image_format), name in self.photo_variant_names(self.profile_photo.name).items():
+            if not ready:
+                url = placeholder
+            elif self.profile_photo_version is None:
+                # Stored before variants existed, only the photo itself is there
+                url = self.profile_photo.url
+            else:
+                url = storage.url(name)
+            urls.setdefault(variant, {})[image_format] = url
+        return urls
+
+    @classmethod
+    def release_photo(cls, storage, photo_name):
+        """
+        Drop a reference to a stored profile photo. Deduplicated storage
+        deletes the variants together with the blob, other storages need
+        them deleted by name.
+        """
+        if isinstance(storage, DeduplicatedStorage):
+            storage.delete(photo_name)
+            return
+        for name in cls.photo_variant_names(photo_name).values():
+            storage.delete(name)
+
+    def release_file(self, field_name, name):
+        """
+        Release a stored file this profile no longer points at, once the
+        current transaction commits.
+        """
+        storage = self._meta.get_field(field_name).storage
+        if field_name == 'profile_photo':
+            transaction.on_commit(lambda: self.release_photo(storage, name))
+        else:
+            transaction.on_commit(lambda: storage.delete(name))
+
+    @staticmethod
+    def photo_variant_names(photo_name):
+        """
+        Storage names of every variant of a photo, keyed by (variant, format).
+        The first variant in the first format is the photo itself.
+        """
+        config = settings.PROFILE_PHOTOS
+        names = {}
+        for variant in config['VARIANTS']:
+            for image_format in config['FORMATS']:
+                names[variant, image_format] = (
+                    variant_name(photo_name, variant, image_format) if names else photo_name
+                )
+        return names
+
+    def save(self, *args, **kwargs):
+        # A new upload is stored as is and optimized in the background
+        photo_uploaded = bool(self.profile_photo) and not self.profile_photo._committed
+        if photo_uploaded:
+            self.profile_photo_status = PHOTO_PENDING
+            self.profile_photo_version = None
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'profile_photo_status', 'profile_photo_version'
+                }
+        elif not self.profile_photo:
+            self.profile_photo_status = None
+            self.profile_photo_version = None
+        super().save(*args, **kwargs)
+
+        if photo_uploaded:
+            from apps.core.tasks import optimize_profile_photo
+
+            model, profile_id, photo_name = self._meta.label, str(self.pk), self.profile_photo.name
+            transaction.on_commit(
+                lambda: optimize_profile_photo.delay(profile_id, photo_name, model=model)
+            )
+
+
+class CustomerProfile(BaseModel, ProfilePhotoMixin):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='customer_profile')
     date_of_birth = models.DateField()
-    preferred_service_areas = models.TextField(help_text="Enter comma-separated areas, e.g., 'Ikeja, Yaba'")
+    service_areas = models.ManyToManyField(
+        'ServiceArea',
+        blank=True,
+        related_name='customers',
+        help_text="Areas the customer prefers to be served in"
+    )
     profile_photo = models.ImageField(
         upload_to='profile_photos/customers/', 
         null=True, 
@@ -70,17 +217,8 @@ class CustomerProfile(BaseModel):
     def __str__(self):
         return f"Customer: {self.user.full_name}"
 
-    def profile_photo_url(self):
-        return self.profile_photo.url if self.profile_photo else None
-        
-    def save(self, *args, **kwargs):
-        # Optimize profile photo if it's being updated
-        if self.profile_photo and hasattr(self.profile_photo, 'file'):
-            self.profile_photo = optimize_image(self.profile_photo)
-        super().save(*args, **kwargs)
-
 
-class ServiceProviderProfile(BaseModel):
+class ServiceProviderProfile(BaseModel, ProfilePhotoMixin):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='provider_profile')
     is_business = models.BooleanField(default=False)
     business_name = models.CharField(max_length=255)
@@ -101,8 +239,21 @@ class ServiceProviderProfile(BaseModel):
         help_text="Profile photo will be automatically optimized for quality and size. Supported formats: JPG, JPEG, PNG, GIF, WEBP"
     )
     is_verified = models.BooleanField(default=False)
+    service_areas = models.ManyToManyField(
+        'ServiceArea',
+        blank=True,
+        related_name='providers',
+        help_text="Areas the provider serves"
+    )
     longitude = models.FloatField(null=True, blank=True)
     latitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(
+        max_length=12,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Geohash of latitude and longitude, kept in sync on save"
+    )
     is_available = models.BooleanField(default=False)
     average_rating = models.DecimalField(
         max_digits=3, 
@@ -120,9 +271,27 @@ class ServiceProviderProfile(BaseModel):
     class Meta:
         verbose_name = 'Service Provider Profile'
         verbose_name_plural = 'Service Provider Profiles'
+        indexes = [
+            # Only bookable providers are ever searched by location
+            models.Index(
+                fields=['geohash'],
+                condition=models.Q(is_available=True, is_verified=True),
+                name='provider_bookable_geohash_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Service Provider: {self.business_name} ({'Active' if self.is_active else 'Inactive'})"
+
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geohash_encode(self.latitude, self.longitude)
+        else:
+            self.geohash = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
         
 
 class Address(BaseModel):
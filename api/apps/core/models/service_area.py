@@ -0,0 +1,45 @@
+from django.db import models
+
+from apps.common.models import BaseModel
+from apps.core.managers import ServiceAreaManager, service_area_key
+
+
+class ServiceArea(BaseModel):
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(
+        max_length=100,
+        unique=True,
+        editable=False,
+        help_text="Canonical lookup key, derived from the name"
+    )
+
+    objects = ServiceAreaManager()
+
+    class Meta:
+        verbose_name = 'Service Area'
+        verbose_name_plural = 'Service Areas'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.slug = service_area_key(self.name)
+        super().save(*args, **kwargs)
+
+
+class ServiceAreaAlias(BaseModel):
+    area = models.ForeignKey(ServiceArea, on_delete=models.CASCADE, related_name='aliases')
+    name = models.CharField(max_length=100, help_text="Another spelling or name, e.g. 'VI'")
+    slug = models.SlugField(max_length=100, unique=True, editable=False)
+
+    class Meta:
+        verbose_name = 'Service Area Alias'
+        verbose_name_plural = 'Service Area Aliases'
+
+    def __str__(self):
+        return f"{self.name} ({self.area.name})"
+
+    def save(self, *args, **kwargs):
+        self.slug = service_area_key(self.name)
+        super().save(*args, **kwargs)
@@ -0,0 +1,233 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+from utilities.geo import geohash_encode, geohashes_in_box
+
+REGION_KEY = "presence:region:{region}"
+REGIONS_KEY = "presence:regions"
+LOCATIONS_KEY = "presence:locations"
+PRUNE_BATCH_SIZE = 1000
+
+# Drops location entries whose provider is no longer in the region the entry
+# names. KEYS are the locations hash then one region key per provider, ARGV
+# the cutoff then (provider id, location) pairs as read before the script.
+# The entry is rechecked here so a heartbeat that landed since is never lost.
+PRUNE_LOCATIONS_SCRIPT = """
+local cutoff = tonumber(ARGV[1])
+local removed = 0
+for i = 2, #KEYS do
+    local provider_id = ARGV[2 * i - 2]
+    if redis.call("HGET", KEYS[1], provider_id) == ARGV[2 * i - 1] then
+        local seen = redis.call("ZSCORE", KEYS[i], provider_id)
+        if not seen or tonumber(seen) < cutoff then
+            redis.call("HDEL", KEYS[1], provider_id)
+            removed = removed + 1
+        end
+    end
+end
+return removed
+"""
+
+
+class PresenceStore:
+    """
+    Tracks which providers are online from app heartbeats, without writing
+    to the database on every ping.
+
+    On the Redis cache each region (a geohash cell of REGION_PRECISION) is a
+    sorted set of provider ids scored by their last heartbeat, and the last
+    reported position of every provider is kept in one hash. A provider is
+    online while its score is within TTL_SECONDS, so stale providers drop out
+    without any cleanup; `prune` trims them from Redis periodically.
+
+    Other cache backends (locmem in development) keep every provider's
+    position, region and last heartbeat in one cache entry, read and written
+    back under a process lock.
+    """
+
+    def __init__(self, cache_alias="default"):
+        self.cache = caches[cache_alias]
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return settings.PROVIDER_PRESENCE
+
+    def region_for(self, latitude, longitude):
+        return geohash_encode(latitude, longitude, self.config["REGION_PRECISION"])
+
+    def _redis(self):
+        if isinstance(self.cache, RedisCache):
+            return self.cache._cache.get_client(write=True)
+        return None
+
+    def _key(self, key):
+        return self.cache.make_key(key)
+
+    def heartbeat(self, provider_id, latitude, longitude):
+        """
+        Record that a provider is online at the given position.
+        """
+        provider_id = str(provider_id)
+        region = self.region_for(latitude, longitude)
+        now = time.time()
+        client = self._redis()
+        if client is None:
+            with self._lock:
+                providers = self.cache.get(LOCATIONS_KEY) or {}
+                providers[provider_id] = (latitude, longitude, region, now)
+                self.cache.set(LOCATIONS_KEY, providers, None)
+            return
+
+        region_key = self._key(REGION_KEY.format(region=region))
+        pipeline = client.pipeline(transaction=False)
+        pipeline.zadd(region_key, {provider_id: now})
+        pipeline.expire(region_key, self.config["TTL_SECONDS"] * 2)
+        pipeline.hset(self._key(LOCATIONS_KEY), provider_id, f"{latitude},{longitude},{region}")
+        pipeline.sadd(self._key(REGIONS_KEY), region)
+        pipeline.execute()
+
+    def go_offline(self, provider_id):
+        provider_id = str(provider_id)
+        client = self._redis()
+        if client is None:
+            with self._lock:
+                providers = self.cache.get(LOCATIONS_KEY) or {}
+                if providers.pop(provider_id, None) is not None:
+                    self.cache.set(LOCATIONS_KEY, providers, None)
+            return
+
+        location = client.hget(self._key(LOCATIONS_KEY), provider_id)
+        pipeline = client.pipeline(transaction=False)
+        if location:
+            region = location.decode().rsplit(",", 1)[1]
+            pipeline.zrem(self._key(REGION_KEY.format(region=region)), provider_id)
+        pipeline.hdel(self._key(LOCATIONS_KEY), provider_id)
+        pipeline.execute()
+
+    def online_in_box(self, min_lat, max_lat, min_lon, max_lon):
+        """
+        Online providers in the regions covering a bounding box.
+
+        :return: Dict of provider id to (latitude, longitude).
+        """
+        regions = geohashes_in_box(
+            min_lat, max_lat, min_lon, max_lon, self.config["REGION_PRECISION"]
+        )
+        return self._online(regions)
+
+    def online(self):
+        """
+        Every online provider.
+
+        :return: Dict of provider id to (latitude, longitude).
+        """
+        return self._online(None)
+
+    def _online(self, regions):
+        cutoff = time.time() - self.config["TTL_SECONDS"]
+        client = self._redis()
+        if client is None:
+            providers = self.cache.get(LOCATIONS_KEY) or {}
+            return {
+                provider_id: (latitude, longitude)
+                for provider_id, (latitude, longitude, region, seen) in providers.items()
+                if seen >= cutoff and (regions is None or region in regions)
+            }
+
+        if regions is None:
+            regions = [region.decode() for region in client.smembers(self._key(REGIONS_KEY))]
+        regions = list(regions)
+        pipeline = client.pipeline(transaction=False)
+        for region in regions:
+            pipeline.zrangebyscore(self._key(REGION_KEY.format(region=region)), cutoff, "+inf")
+        members = {
+            member.decode(): region
+            for region, region_members in zip(regions, pipeline.execute())
+            for member in region_members
+        }
+        if not members:
+            return {}
+
+        provider_ids = list(members)
+        locations = client.hmget(self._key(LOCATIONS_KEY), provider_ids)
+        online = {}
+        for provider_id, location in zip(provider_ids, locations):
+            if not location:
+                continue
+            latitude, longitude, region = location.decode().split(",")
+            # Moved since: the entry in the old region is left to expire
+            if region == members[provider_id]:
+                online[provider_id] = (float(latitude), float(longitude))
+        return online
+
+    def prune(self):
+        """
+        Drop providers whose last heartbeat is older than TTL_SECONDS.
+        """
+        cutoff = time.time() - self.config["TTL_SECONDS"]
+        client = self._redis()
+        if client is None:
+            with self._lock:
+                providers = self.cache.get(LOCATIONS_KEY) or {}
+                online = {
+                    provider_id: entry
+                    for provider_id, entry in providers.items()
+                    if entry[3] >= cutoff
+                }
+                if len(online) < len(providers):
+                    self.cache.set(LOCATIONS_KEY, online, None)
+            return
+
+        regions_key = self._key(REGIONS_KEY)
+        regions = [region.decode() for region in client.smembers(regions_key)]
+        pipeline = client.pipeline(transaction=False)
+        for region in regions:
+            region_key = self._key(REGION_KEY.format(region=region))
+            pipeline.zremrangebyscore(region_key, "-inf", f"({cutoff}")
+            pipeline.zcard(region_key)
+        results = pipeline.execute()
+        empty = [region for region, count in zip(regions, results[1::2]) if not count]
+        if empty:
+            client.srem(regions_key, *empty)
+
+        locations_key = self._key(LOCATIONS_KEY)
+        prune_locations = client.register_script(PRUNE_LOCATIONS_SCRIPT)
+        batch = []
+        for entry in client.hscan_iter(locations_key, count=PRUNE_BATCH_SIZE):
+            batch.append(entry)
+            if len(batch) >= PRUNE_BATCH_SIZE:
+                self._prune_locations(client, prune_locations, batch, cutoff)
+                batch = []
+        if batch:
+            self._prune_locations(client, prune_locations, batch, cutoff)
+
+    def _prune_locations(self, client, prune_locations, entries, cutoff):
+        """
+        Drop the location entries in `entries`, (provider id, location)
+        pairs, whose provider has expired from the region they name.
+        """
+        region_keys = [
+            self._key(REGION_KEY.format(region=location.decode().rsplit(",", 1)[1]))
+            for _, location in entries
+        ]
+        pipeline = client.pipeline(transaction=False)
+        for (provider_id, _), region_key in zip(entries, region_keys):
+            pipeline.zscore(region_key, provider_id)
+        stale = [
+            (entry, region_key)
+            for entry, region_key, seen in zip(entries, region_keys, pipeline.execute())
+            if seen is None or seen < cutoff
+        ]
+        if not stale:
+            return
+        prune_locations(
+            keys=[self._key(LOCATIONS_KEY), *[region_key for _, region_key in stale]],
+            args=[cutoff, *[value for entry, _ in stale for value in entry]],
+        )
+
+presence_store = PresenceStore()
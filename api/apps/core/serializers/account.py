@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from ..choices import CUSTOMER, USER_TYPES
 from ..models.account import CustomerProfile, ServiceProviderProfile, Address
+from ..models.service_area import ServiceArea
 
 User = get_user_model()
 
@@ -9,37 +11,93 @@ class CustomerRegistrationSerializer(serializers.Serializer):
     full_name = serializers.CharField()
     email = serializers.EmailField()
     phone_number = serializers.CharField()
-    full_name = serializers.CharField()
     password = serializers.CharField(write_only=True, style={'input_type': 'password'})
-    user_type = serializers.ChoiceField(choices=User.USER_TYPE_CHOICES, default=User.CUSTOMER, read_only=True)
+    user_type = serializers.ChoiceField(choices=USER_TYPES, default=CUSTOMER, read_only=True)
     preferred_service_areas = serializers.ListField(
-        child=serializers.CharField(),
+        child=serializers.CharField(max_length=100),
         required=False,
         help_text="List of preferred service areas (e.g., neighborhoods, cities: Ikeja, Mainland)"
     )
     date_of_birth = serializers.DateField(required=False, write_only=True)
     terms_accepted = serializers.BooleanField(required=True)
     
-    def validate_email(self, value):
-        """Validate that the email is not already in use"""
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Email is already in use.")
-        return value
-    
-    def validate_phone_number(self, value):
-        """Validate that the phone number is not already in use"""
-        if User.objects.filter(phone_number=value).exists():
-            raise serializers.ValidationError("Phone number is already in use.")
-        return value
-    
     def validate(self, data):
         if not data.get('terms_accepted', False):
             raise serializers.ValidationError({"terms_accepted": "You must accept the terms and conditions."})
         
+        # One lookup for both unique fields; the insert itself still has the final say
+        conflicts = User.objects.credential_conflicts(data['email'], data['phone_number'])
+        if conflicts:
+            raise serializers.ValidationError(conflicts)
+        
         return data
 
 
 class VerificationSerializer(serializers.Serializer):
     """Serializer for verification codes"""
-    user_id = serializers.IntegerField()
+    user_id = serializers.UUIDField()
     code = serializers.CharField(max_length=6)
+
+
+class HeartbeatSerializer(serializers.Serializer):
+    """Serializer for a provider's presence heartbeat"""
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+
+
+class ServiceAreaNamesField(serializers.ListField):
+    """
+    Service areas as a list of names. Validation only checks the names; the
+    serializer matches them to areas by name or alias, creating any new
+    ones, when it saves.
+    """
+    child = serializers.CharField(max_length=100)
+
+    def to_representation(self, value):
+        return [area.name for area in value.all()]
+
+
+class CustomerProfileSerializer(serializers.ModelSerializer):
+    """Serializer for the customer's own profile"""
+    preferred_service_areas = ServiceAreaNamesField(source='service_areas', required=False)
+    profile_photo = serializers.ImageField(write_only=True, required=False, allow_null=True)
+    profile_photo_url = serializers.SerializerMethodField()
+    profile_photo_urls = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CustomerProfile
+        fields = [
+            'date_of_birth',
+            'preferred_service_areas',
+            'profile_photo',
+            'profile_photo_url',
+            'profile_photo_urls',
+            'profile_photo_status',
+            'notification_preferences',
+        ]
+        read_only_fields = ['profile_photo_status']
+
+    def update(self, instance, validated_data):
+        area_names = validated_data.pop('service_areas', None)
+        instance = super().update(instance, validated_data)
+        if area_names is not None:
+            instance.service_areas.set(ServiceArea.objects.resolve(area_names))
+        return instance
+
+    def build_url(self, url):
+        request = self.context.get('request')
+        if url and request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_profile_photo_url(self, obj):
+        return self.build_url(obj.profile_photo_url())
+
+    def get_profile_photo_urls(self, obj):
+        urls = obj.profile_photo_urls()
+        if urls is None:
+            return None
+        return {
+            variant: {image_format: self.build_url(url) for image_format, url in formats.items()}
+            for variant, formats in urls.items()
+        }
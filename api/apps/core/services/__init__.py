@@ -1 +1,6 @@
-from .account import *
\ No newline at end of file
+from .account import *
+from .verification import *
+from .password import *
+from .photo import *
+from .provider import *
+from .dispatch import *
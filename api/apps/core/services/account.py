@@ -1,14 +1,20 @@
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-import random
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+import secrets
 import string
 import logging
 
+from ..choices import CUSTOMER, EMAIL_VERIFICATION, PHONE_VERIFICATION
+from .. import tasks
 from ..models.account import CustomerProfile, ServiceProviderProfile
+from ..models.service_area import ServiceArea
+from .verification import verification_code_store
+from utilities.email_templates import email_templates
+from utilities.mail import build_message, mail_dispatcher
+from utilities.sms import send_sms
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -22,7 +28,7 @@ class AccountService:
     @staticmethod
     def generate_verification_code(length=6):
         """Generate a random verification code."""
-        return ''.join(random.choices(string.digits, k=length))
+        return ''.join(secrets.choice(string.digits) for _ in range(length))
     
     @classmethod
     def create_user(cls, email, phone_number, full_name, password, user_type):
@@ -40,13 +46,7 @@ class AccountService:
             Newly created user object
         """
         try:
-            user = User.objects.create_user(
-                email=email,
-                phone_number=phone_number,
-                full_name=full_name,
-                password=password,
-                user_type=user_type
-            )
+            user = cls._insert_user(email, phone_number, full_name, password, user_type)
             
             # Generate and store verification codes
             email_code = cls.generate_verification_code()
@@ -55,15 +55,72 @@ class AccountService:
             # Store verification codes (implementation depends on your verification model)
             cls.store_verification_codes(user, email_code, phone_code)
             
-            # Send verification emails and SMS
-            cls.send_email_verification(user, email_code)
-            cls.send_phone_verification(user, phone_code)
+            # Send verification emails and SMS from celery once the user is committed
+            cls.dispatch_email_verification(user, email_code)
+            cls.dispatch_phone_verification(user, phone_code)
             
             return user
         except Exception as e:
             logger.error(f"Error creating user: {str(e)}")
             raise
     
+    @staticmethod
+    def _insert_user(email, phone_number, full_name, password, user_type):
+        """
+        Insert the user, translating a unique constraint violation on email or
+        phone number into the same field errors the serializer reports.
+        """
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(
+                    email=email,
+                    phone_number=phone_number,
+                    full_name=full_name,
+                    password=password,
+                    user_type=user_type
+                )
+        except IntegrityError:
+            conflicts = User.objects.credential_conflicts(email, phone_number)
+            if conflicts:
+                raise ValidationError(conflicts)
+            raise
+    
+    @classmethod
+    def register_customer(cls, email, phone_number, full_name, password,
+                          date_of_birth=None, preferred_service_areas=None):
+        """
+        Register a customer as a single unit of work. The user, the customer
+        profile, the refresh token's OutstandingToken row and the verification
+        codes are created in one transaction; verification messages are only
+        queued once it commits, so a failure never leaves an orphan user.
+        
+        Args:
+            email: User's email address
+            phone_number: User's phone number
+            full_name: User's full name
+            password: User's password
+            date_of_birth: Customer's date of birth
+            preferred_service_areas: List of preferred service areas
+            
+        Returns:
+            Tuple of the new user and their access and refresh tokens
+        """
+        with transaction.atomic():
+            user = cls.create_user(
+                email=email,
+                phone_number=phone_number,
+                full_name=full_name,
+                password=password,
+                user_type=CUSTOMER
+            )
+            cls.create_customer_profile(
+                user=user,
+                date_of_birth=date_of_birth,
+                preferred_service_areas=preferred_service_areas
+            )
+            tokens = user.tokens()
+        return user, tokens
+    
     @classmethod
     def create_customer_profile(cls, user, date_of_birth=None, preferred_service_areas=None):
         """
@@ -72,7 +129,8 @@ class AccountService:
         Args:
             user: User object
             date_of_birth: Customer's date of birth
-            preferred_service_areas: Customer's preferred service areas
+            preferred_service_areas: List of preferred service area names,
+                matched to areas by name or alias
             
         Returns:
             Newly created customer profile
@@ -80,9 +138,10 @@ class AccountService:
         try:
             profile = CustomerProfile.objects.create(
                 user=user,
-                date_of_birth=date_of_birth,
-                preferred_service_areas=preferred_service_areas or ""
+                date_of_birth=date_of_birth
             )
+            if preferred_service_areas:
+                profile.service_areas.set(ServiceArea.objects.resolve(preferred_service_areas))
             return profile
         except Exception as e:
             logger.error(f"Error creating customer profile: {str(e)}")
@@ -115,12 +174,51 @@ class AccountService:
     @staticmethod
     def store_verification_codes(user, email_code, phone_code):
         """
-        Store verification codes for a user.
-        This is a placeholder - implement according to your verification model.
+        Store hashed verification codes for a user in the verification code store
+        and start the resend cooldown for both.
+
+        Args:
+            user: User object
+            email_code: Email verification code
+            phone_code: Phone verification code
         """
-        # Implementation depends on your verification model
-        # For example, you might store these in Redis or a VerificationCode model
-        pass
+        for purpose, code in ((EMAIL_VERIFICATION, email_code), (PHONE_VERIFICATION, phone_code)):
+            verification_code_store.issue(user.pk, purpose, code)
+            verification_code_store.start_cooldown(user.pk, purpose)
+    
+    @staticmethod
+    def dispatch_email_verification(user, verification_code):
+        """
+        Queue the verification email to be sent by a celery worker after the
+        current transaction commits.
+        
+        Args:
+            user: User object
+            verification_code: Email verification code
+        """
+        user_id = str(user.pk)
+        transaction.on_commit(
+            lambda: tasks.send_email_verification.delay(
+                user_id=user_id, verification_code=verification_code
+            )
+        )
+    
+    @staticmethod
+    def dispatch_phone_verification(user, verification_code):
+        """
+        Queue the verification SMS to be sent by a celery worker after the
+        current transaction commits.
+        
+        Args:
+            user: User object
+            verification_code: Phone verification code
+        """
+        user_id = str(user.pk)
+        transaction.on_commit(
+            lambda: tasks.send_phone_verification.delay(
+                user_id=user_id, verification_code=verification_code
+            )
+        )
     
     @staticmethod
     def send_email_verification(user, verification_code):
@@ -132,21 +230,18 @@ class AccountService:
             verification_code: Email verification code
         """
         try:
-            subject = 'Verify Your Email Address'
-            html_message = render_to_string(
-                'emails/email_verification.html',
-                {'user': user, 'verification_code': verification_code}
+            subject, plain_message, html_message = email_templates.render(
+                'email_verification',
+                {
+                    'user': user,
+                    'verification_code': verification_code,
+                    'expires_in_minutes': settings.VERIFICATION_CODES['CODE_TTL'] // 60,
+                },
             )
-            plain_message = strip_tags(html_message)
             
-            send_mail(
-                subject,
-                plain_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                html_message=html_message,
-                fail_silently=False
-            )
+            mail_dispatcher.send([
+                build_message(subject, plain_message, [user.email], html_message=html_message)
+            ])
         except Exception as e:
             logger.error(f"Error sending email verification: {str(e)}")
             raise
@@ -160,15 +255,11 @@ class AccountService:
             user: User object
             verification_code: Phone verification code
         """
-        # Implementation depends on your SMS provider
-        # This is a placeholder
         try:
-            # Example using a hypothetical SMS service
-            # sms_service.send_sms(
-            #     to=user.phone_number,
-            #     message=f"Your verification code is: {verification_code}"
-            # )
-            pass
+            send_sms(
+                to=user.phone_number,
+                body=f"Your NESTWASH verification code is: {verification_code}"
+            )
         except Exception as e:
             logger.error(f"Error sending phone verification: {str(e)}")
             raise
@@ -185,15 +276,14 @@ class AccountService:
         Returns:
             Boolean indicating whether verification was successful
         """
-        # Implementation depends on your verification model
-        # This is a placeholder
         try:
-            # Check if verification code matches
-            # if verification_code_matches:
-            user.email_verified = True
-            user.save(update_fields=['email_verified'])
+            if not verification_code_store.verify(user.pk, EMAIL_VERIFICATION, verification_code):
+                return False
+
+            if not user.email_verified:
+                user.email_verified = True
+                user.save(update_fields=['email_verified'])
             return True
-            # return False
         except Exception as e:
             logger.error(f"Error verifying email: {str(e)}")
             return False
@@ -210,15 +300,14 @@ class AccountService:
         Returns:
             Boolean indicating whether verification was successful
         """
-        # Implementation depends on your verification model
-        # This is a placeholder
         try:
-            # Check if verification code matches
-            # if verification_code_matches:
-            user.phone_number_verified = True
-            user.save(update_fields=['phone_number_verified'])
+            if not verification_code_store.verify(user.pk, PHONE_VERIFICATION, verification_code):
+                return False
+
+            if not user.phone_number_verified:
+                user.phone_number_verified = True
+                user.save(update_fields=['phone_number_verified'])
             return True
-            # return False
         except Exception as e:
             logger.error(f"Error verifying phone: {str(e)}")
             return False
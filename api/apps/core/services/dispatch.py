@@ -0,0 +1,228 @@
+import logging
+import uuid
+
+import numpy as np
+from django.conf import settings
+
+from apps.core.dispatch import dispatch_queue
+from apps.core.locator import provider_locator
+from apps.core.presence import presence_store
+from utilities.assignment import AUCTION, HUNGARIAN, solve_assignment
+from utilities.general import create_failed_task_log
+from utilities.geo import bounding_box, haversine_km_matrix
+
+logger = logging.getLogger(__name__)
+
+MAX_RATING = 5.0
+ASSIGN_LOCK_KEY = 'dispatch:assign'
+
+
+class DispatchService:
+    """
+    Service class for assigning pending jobs to online providers in batches.
+
+    Jobs collect in the dispatch queue for a short window, then the whole
+    batch is solved as one minimum cost assignment instead of greedily
+    giving each job its nearest provider, which piles work onto providers
+    in busy areas while others nearby stay idle.
+    """
+
+    @staticmethod
+    def submit_job(latitude, longitude, job_id=None):
+        """
+        Queue a job for the next assignment window.
+
+        Args:
+            latitude: Latitude of the job in degrees
+            longitude: Longitude of the job in degrees
+            job_id: Identifier of the job, generated if not given
+
+        Returns:
+            The job id, to look the assignment up with dispatch_queue.assignment_for
+        """
+        job_id = str(job_id or uuid.uuid4())
+        dispatch_queue.enqueue({'id': job_id, 'latitude': latitude, 'longitude': longitude})
+        return job_id
+
+    @staticmethod
+    def defer_cost():
+        """
+        Cost of leaving a job for the next window. It is higher than any
+        allowed pair, so a job is only deferred when no provider in reach is
+        free.
+        """
+        config = settings.DISPATCH
+        return (
+            config['MAX_RADIUS_KM']
+            + config['RATING_WEIGHT_KM'] * MAX_RATING
+            + config['LOAD_WEIGHT_KM'] * config['MAX_LOAD']
+            + 1
+        )
+
+    @classmethod
+    def cost_matrix(cls, job_positions, provider_positions, ratings, loads):
+        """
+        Cost of giving each job to each provider, in kilometre equivalents:
+        the distance, plus RATING_WEIGHT_KM for every star below five, plus
+        LOAD_WEIGHT_KM for every job the provider is already working on.
+
+        Pairs that are not allowed (further than MAX_RADIUS_KM, or a provider
+        at MAX_LOAD) cost defer_cost(), so giving a job one of them is the
+        same as deferring it, and the solver needs no extra columns.
+
+        Args:
+            job_positions: Array of (latitude, longitude) of shape (n, 2)
+            provider_positions: Array of (latitude, longitude) of shape (m, 2)
+            ratings: Array of m average ratings
+            loads: Array of m current loads
+
+        Returns:
+            Array of shape (n, m)
+        """
+        config = settings.DISPATCH
+        job_positions = np.asarray(job_positions, dtype=float).reshape(-1, 2)
+        provider_positions = np.asarray(provider_positions, dtype=float).reshape(-1, 2)
+        ratings = np.asarray(ratings, dtype=float)
+        loads = np.asarray(loads, dtype=float)
+
+        distances = haversine_km_matrix(
+            job_positions[:, 0], job_positions[:, 1],
+            provider_positions[:, 0], provider_positions[:, 1],
+        )
+        cost = (
+            distances
+            + config['RATING_WEIGHT_KM'] * (MAX_RATING - ratings)[None, :]
+            + config['LOAD_WEIGHT_KM'] * loads[None, :]
+        )
+        cost[(distances > config['MAX_RADIUS_KM']) | (loads >= config['MAX_LOAD'])[None, :]] = (
+            cls.defer_cost()
+        )
+        return cost
+
+    @classmethod
+    def solve(cls, cost, method=None):
+        """
+        Assign jobs (rows) to providers (columns) at the lowest total cost.
+        Jobs and providers without a single allowed pair are left out before
+        solving, which keeps the matrix small when demand is concentrated.
+
+        Args:
+            cost: Matrix from cost_matrix
+            method: HUNGARIAN or AUCTION to force a solver, by default the
+                Hungarian algorithm up to DISPATCH['HUNGARIAN_MAX_JOBS'] jobs
+
+        Returns:
+            Tuple of (job indices, provider indices, solver used)
+        """
+        config = settings.DISPATCH
+        allowed = cost < cls.defer_cost()
+        jobs = np.flatnonzero(allowed.any(axis=1))
+        providers = np.flatnonzero(allowed.any(axis=0))
+        reduced = cost[np.ix_(jobs, providers)]
+
+        if method is None:
+            method = HUNGARIAN if min(reduced.shape) <= config['HUNGARIAN_MAX_JOBS'] else AUCTION
+        rows, columns = solve_assignment(
+            reduced, method=method, epsilon=config['AUCTION_EPSILON_KM']
+        )
+        keep = allowed[jobs[rows], providers[columns]]
+        return jobs[rows[keep]], providers[columns[keep]], method
+
+    @staticmethod
+    def candidate_providers(job_positions):
+        """
+        Online, verified providers close enough to any of the jobs, sorted by
+        id so the same inputs always give the same matrix. Positions come
+        from the presence store, verification and ratings from the in-memory
+        provider locator, so a window costs no database query.
+
+        Returns:
+            Tuple of (provider ids, positions, ratings)
+        """
+        radius_km = settings.DISPATCH['MAX_RADIUS_KM']
+        boxes = np.array([bounding_box(latitude, longitude, radius_km)
+                          for latitude, longitude in job_positions])
+        online = presence_store.online_in_box(
+            boxes[:, 0].min(), boxes[:, 1].max(), boxes[:, 2].min(), boxes[:, 3].max()
+        )
+        if not online:
+            return [], np.empty((0, 2)), np.empty(0)
+
+        ratings = provider_locator.ratings(online)
+        provider_ids = sorted(ratings)
+        positions = np.array([online[provider_id] for provider_id in provider_ids]).reshape(-1, 2)
+        return (
+            provider_ids,
+            positions,
+            np.array([ratings[provider_id] for provider_id in provider_ids]),
+        )
+
+    @classmethod
+    def assign_pending(cls, batch_size=None, method=None):
+        """
+        Assign one window of pending jobs. Jobs without a provider in reach
+        go back to the head of the queue for the next window, up to
+        DISPATCH['MAX_DEFERRALS'] times, then are logged to TaskLog and dropped.
+
+        Args:
+            batch_size: Most jobs to assign at once, defaults to DISPATCH['BATCH_SIZE']
+            method: HUNGARIAN or AUCTION to force a solver
+
+        Returns:
+            Dict with the number of jobs assigned, deferred and dropped, and the solver used
+        """
+        batch_size = batch_size or settings.DISPATCH['BATCH_SIZE']
+        # Overlapping runs would both count the same provider as free
+        if not dispatch_queue.cache.add(ASSIGN_LOCK_KEY, 1, 60):
+            return {'assigned': 0, 'deferred': 0, 'expired': 0, 'method': None}
+        try:
+            jobs = dispatch_queue.take(batch_size)
+            if not jobs:
+                return {'assigned': 0, 'deferred': 0, 'expired': 0, 'method': None}
+            # Taken jobs are only in this process until they are assigned or
+            # requeued, so put them back if anything goes wrong in between
+            unassigned = jobs
+            try:
+                job_positions = np.array([(job['latitude'], job['longitude']) for job in jobs])
+                provider_ids, positions, ratings = cls.candidate_providers(job_positions)
+                loads = dispatch_queue.loads(provider_ids)
+                cost = cls.cost_matrix(job_positions, positions, ratings, loads)
+                rows, columns, method = cls.solve(cost, method=method)
+                assignments = [
+                    (jobs[row]['id'], provider_ids[column]) for row, column in zip(rows, columns)
+                ]
+                dispatch_queue.record_assignments(assignments)
+
+                assigned_rows = set(rows.tolist())
+                unassigned = [job for row, job in enumerate(jobs) if row not in assigned_rows]
+                deferred, expired = [], []
+                for job in unassigned:
+                    job['deferrals'] = job.get('deferrals', 0) + 1
+                    if job['deferrals'] > settings.DISPATCH['MAX_DEFERRALS']:
+                        expired.append(job)
+                    else:
+                        deferred.append(job)
+                dispatch_queue.requeue(deferred)
+            except Exception:
+                dispatch_queue.requeue(unassigned)
+                raise
+        finally:
+            dispatch_queue.cache.delete(ASSIGN_LOCK_KEY)
+
+        if expired:
+            logger.warning(f"Gave up on {len(expired)} jobs with no provider in reach")
+            create_failed_task_log(
+                checkpoint='dispatch.assign_pending',
+                message=f"No provider in reach after {settings.DISPATCH['MAX_DEFERRALS']} windows",
+                data_details={'jobs': expired},
+            )
+        logger.info(
+            f"Assigned {len(assignments)} of {len(jobs)} pending jobs to "
+            f"{len(provider_ids)} providers ({method})"
+        )
+        return {
+            'assigned': len(assignments),
+            'deferred': len(deferred),
+            'expired': len(expired),
+            'method': method,
+        }
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+logger = logging.getLogger(__name__)
+
+# Bounded so a burst of logins can't spawn unlimited hashing threads; hashlib
+# releases the GIL while hashing, so these run in parallel with the event loop
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASHING_THREADS,
+    thread_name_prefix='password-hashing',
+)
+
+
+class PasswordService:
+    """
+    Service class for password hashing. The async variants run the hasher in a
+    bounded thread pool so async views never block the event loop on it.
+    """
+
+    @staticmethod
+    def hash_password(raw_password):
+        """
+        Hash a password with the preferred (tuned) hasher.
+        
+        Args:
+            raw_password: Plain text password
+            
+        Returns:
+            Encoded password hash
+        """
+        return make_password(raw_password)
+
+    @staticmethod
+    def check_password(user, raw_password):
+        """
+        Check a password. A hash made with an older hasher or work factor is
+        upgraded and saved on success.
+        
+        Args:
+            user: User object
+            raw_password: Plain text password
+            
+        Returns:
+            Boolean indicating whether the password is correct
+        """
+        return user.check_password(raw_password)
+
+    @classmethod
+    async def ahash_password(cls, raw_password):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, cls.hash_password, raw_password)
+
+    @classmethod
+    async def acheck_password(cls, user, raw_password):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _executor, cls.check_password, user, raw_password
+        )
@@ -0,0 +1,147 @@
+import logging
+import os
+
+from django.apps import apps
+from django.conf import settings
+from PIL import Image
+
+from apps.common.storage import DeduplicatedStorage
+from apps.core.choices import PHOTO_FAILED, PHOTO_READY
+from utilities.images import generate_variants
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of ProfilePhotoService.optimize
+OPTIMIZED = 'optimized'
+AS_IS = 'as_is'
+REUSED = 'reused'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+SUPERSEDED = 'superseded'
+
+
+class ProfilePhotoService:
+    """
+    Service class for replacing uploaded profile photos with their optimized
+    variants. Used by the optimize_profile_photo task and the reoptimize_media
+    command.
+    """
+
+    @classmethod
+    def optimize(cls, model, profile_id, photo_name):
+        """
+        Replace a profile photo with its optimized variants.
+
+        The swap only happens if the profile still points at `photo_name`, so a
+        newer upload that arrived in the meantime is never overwritten.
+
+        Args:
+            model: Model label, e.g. 'core.CustomerProfile'
+            profile_id: Primary key of the profile
+            photo_name: Storage name of the photo to optimize
+
+        Returns:
+            Dict with the outcome and the original and optimized sizes in bytes
+        """
+        model = apps.get_model(model)
+        result = {'outcome': SKIPPED, 'original_size': 0, 'optimized_size': 0}
+
+        profile = model.objects.filter(pk=profile_id).first()
+        if profile is None or profile.profile_photo.name != photo_name:
+            logger.info(f"Skipping stale profile photo {photo_name}")
+            return result
+
+        config = settings.PROFILE_PHOTOS
+        field = profile.profile_photo
+        storage = field.storage
+        deduplicated = isinstance(storage, DeduplicatedStorage)
+        current = model.objects.filter(pk=profile_id, profile_photo=photo_name)
+
+        # The same bytes were uploaded and optimized by these settings before,
+        # reuse the result
+        optimized_name = deduplicated and storage.find_by_source(
+            photo_name, version=config['VERSION']
+        )
+        if optimized_name and storage.add_reference(optimized_name):
+            result['outcome'] = cls._swap(
+                current, storage, photo_name, optimized_name, [optimized_name], REUSED
+            )
+            return result
+
+        try:
+            with field.open('rb') as original:
+                result['original_size'] = original.size
+                variants = generate_variants(
+                    original,
+                    sizes=config['VARIANTS'],
+                    formats=config['FORMATS'],
+                    quality=config['QUALITY'],
+                    max_bytes=config['AS_IS_MAX_BYTES'],
+                )
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            logger.warning(f"Could not optimize profile photo {photo_name}: {str(e)}")
+            current.update(profile_photo_status=PHOTO_FAILED)
+            result['outcome'] = FAILED
+            return result
+
+        # The primary variant becomes profile_photo, the others are named after it
+        contents = {
+            (variant, image_format): content
+            for variant, formats in variants.items()
+            for image_format, content in formats.items()
+        }
+        result['optimized_size'] = sum(content.size for content in contents.values())
+        primary = next(iter(model.photo_variant_names(photo_name)))
+
+        # Already small enough: the upload itself is the primary variant
+        as_is = contents[primary] is original
+        if as_is:
+            optimized_name = photo_name
+            saved = []
+        else:
+            stem = os.path.splitext(os.path.basename(photo_name))[0]
+            extension = os.path.splitext(contents[primary].name)[1]
+            optimized_name = storage.save(
+                field.field.generate_filename(profile, f"{stem}{extension}"), contents[primary]
+            )
+            saved = [optimized_name]
+
+        for key, name in model.photo_variant_names(optimized_name).items():
+            if key == primary:
+                continue
+            if deduplicated:
+                # Shares the lifetime of the optimized photo's blob
+                storage.save_derived(optimized_name, name, contents[key])
+                continue
+            # Deterministic names, so clear anything left over from an earlier run
+            if storage.exists(name):
+                storage.delete(name)
+            saved.append(storage.save(name, contents[key]))
+
+        if deduplicated:
+            storage.link_source(optimized_name, photo_name, version=config['VERSION'])
+        result['outcome'] = cls._swap(
+            current, storage, photo_name, optimized_name, saved,
+            AS_IS if as_is else OPTIMIZED,
+        )
+        return result
+
+    @staticmethod
+    def _swap(current, storage, photo_name, optimized_name, discard, outcome):
+        updated = current.update(
+            profile_photo=optimized_name,
+            profile_photo_status=PHOTO_READY,
+            profile_photo_version=settings.PROFILE_PHOTOS['VERSION'],
+        )
+        if updated:
+            if outcome != AS_IS:
+                # Drops the original (and the variants of an earlier
+                # optimization), or the extra reference if the upload was
+                # already optimized and deduplicated to the same blob
+                current.model.release_photo(storage, photo_name)
+            return outcome
+
+        # Superseded by another upload while optimizing
+        for name in discard:
+            storage.delete(name)
+        return SUPERSEDED
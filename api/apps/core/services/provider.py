@@ -0,0 +1,237 @@
+import heapq
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.locator import provider_locator
+from apps.core.models import ServiceProviderProfile
+from apps.core.presence import presence_store
+from utilities.geo import (
+    bounding_box,
+    covering_geohashes,
+    geohash_encode,
+    haversine_km,
+    haversine_km_matrix,
+)
+
+
+class ProviderSearchService:
+    """
+    Service class for finding bookable service providers by location.
+    """
+
+    @staticmethod
+    def bookable_providers():
+        """
+        Providers that can currently be booked.
+        """
+        return ServiceProviderProfile.objects.filter(is_available=True, is_verified=True)
+
+    @classmethod
+    def candidates_within(cls, latitude, longitude, radius_km):
+        """
+        Bookable providers inside the bounding box of a circle, using the
+        geohash index to narrow the scan to the few cells covering the box.
+
+        Args:
+            latitude: Latitude of the centre in degrees
+            longitude: Longitude of the centre in degrees
+            radius_km: Radius of the circle in kilometres
+
+        Returns:
+            QuerySet of providers, a superset of those within radius_km
+        """
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+
+        # Prefix ranges rather than startswith, so both SQLite and Postgres
+        # use the index ('{' sorts right after 'z', the last geohash character).
+        # The partial index condition is repeated in every range, or SQLite
+        # scans the whole index instead of searching each range.
+        cells = reduce(or_, (
+            Q(is_available=True, is_verified=True, geohash__gte=prefix, geohash__lt=f"{prefix}{{")
+            for prefix in covering_geohashes(min_lat, max_lat, min_lon, max_lon)
+        ))
+        return ServiceProviderProfile.objects.filter(
+            cells,
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lon, max_lon),
+        )
+
+    @classmethod
+    def nearest_available(cls, latitude, longitude, k=10, radius_km=None, max_radius_km=None):
+        """
+        The k nearest online, verified providers, using live presence.
+
+        Online providers and their last reported positions come from the
+        presence store, doubling the radius until k are found or
+        max_radius_km is reached. Unverified providers are dropped through
+        the in-memory provider locator, so only the k results are loaded
+        from the database.
+
+        Args:
+            latitude: Latitude of the customer in degrees
+            longitude: Longitude of the customer in degrees
+            k: Number of providers to return
+            radius_km: Initial search radius, defaults to PROVIDER_SEARCH['RADIUS_KM']
+            max_radius_km: Largest search radius, defaults to PROVIDER_SEARCH['MAX_RADIUS_KM']
+
+        Returns:
+            List of providers, nearest first, each with a `distance_km` attribute
+        """
+        config = settings.PROVIDER_SEARCH
+        radius_km = radius_km or config['RADIUS_KM']
+        max_radius_km = max_radius_km or config['MAX_RADIUS_KM']
+
+        while True:
+            online = presence_store.online_in_box(*bounding_box(latitude, longitude, radius_km))
+            verified = provider_locator.ratings(online)
+            distances = {
+                provider_id: haversine_km(latitude, longitude, *online[provider_id])
+                for provider_id in verified
+            }
+            within = sorted(
+                (provider_id for provider_id, distance in distances.items() if distance <= radius_km),
+                key=distances.get,
+            )
+            if len(within) >= k or radius_km >= max_radius_km:
+                break
+            radius_km = min(radius_km * 2, max_radius_km)
+
+        providers = {
+            str(provider.pk): provider
+            for provider in ServiceProviderProfile.objects.filter(
+                pk__in=within[:k]
+            ).select_related('user')
+        }
+        nearest = []
+        for provider_id in within[:k]:
+            provider = providers.get(provider_id)
+            # Skips a provider deleted since the locator last synced
+            if provider is None:
+                continue
+            # Report the live position rather than the last flushed one
+            provider.latitude, provider.longitude = online[provider_id]
+            provider.distance_km = distances[provider_id]
+            nearest.append(provider)
+        return nearest
+
+    @classmethod
+    def nearest_in_database(cls, latitude, longitude, k=10, radius_km=None, max_radius_km=None):
+        """
+        The k nearest available, verified providers, from the database alone.
+
+        Searches a small radius first and doubles it until k providers are
+        found or max_radius_km is reached. Only the ids and coordinates of
+        the candidates are read to rank them by exact haversine distance,
+        then the k nearest are loaded in full.
+
+        Args:
+            latitude: Latitude of the customer in degrees
+            longitude: Longitude of the customer in degrees
+            k: Number of providers to return
+            radius_km: Initial search radius, defaults to PROVIDER_SEARCH['RADIUS_KM']
+            max_radius_km: Largest search radius, defaults to PROVIDER_SEARCH['MAX_RADIUS_KM']
+
+        Returns:
+            List of providers, nearest first, each with a `distance_km` attribute
+        """
+        config = settings.PROVIDER_SEARCH
+        radius_km = radius_km or config['RADIUS_KM']
+        max_radius_km = max_radius_km or config['MAX_RADIUS_KM']
+
+        while True:
+            candidates = list(
+                cls.candidates_within(latitude, longitude, radius_km).values_list(
+                    'id', 'latitude', 'longitude'
+                )
+            )
+            within = []
+            if candidates:
+                ids, latitudes, longitudes = zip(*candidates)
+                distances = haversine_km_matrix([latitude], [longitude], latitudes, longitudes)[0]
+                # The box corners are further away than the radius
+                within = [
+                    (distance, provider_id)
+                    for provider_id, distance in zip(ids, distances.tolist())
+                    if distance <= radius_km
+                ]
+            if len(within) >= k or radius_km >= max_radius_km:
+                break
+            radius_km = min(radius_km * 2, max_radius_km)
+
+        nearest = heapq.nsmallest(k, within)
+        providers = ServiceProviderProfile.objects.select_related('user').in_bulk(
+            [provider_id for _, provider_id in nearest]
+        )
+        result = []
+        for distance, provider_id in nearest:
+            # Skips a provider deleted since it was ranked
+            if provider_id in providers:
+                providers[provider_id].distance_km = distance
+                result.append(providers[provider_id])
+        return result
+
+
+class ProviderPresenceService:
+    """
+    Service class for writing provider presence back to the database.
+    """
+
+    @staticmethod
+    def flush(batch_size=None):
+        """
+        Bring `is_available` and the stored locations in line with the
+        presence store, in batched UPDATEs rather than one per heartbeat.
+        Providers that stopped sending heartbeats are marked unavailable.
+
+        Args:
+            batch_size: Rows per UPDATE, defaults to PROVIDER_PRESENCE['FLUSH_BATCH_SIZE']
+
+        Returns:
+            Dict with the number of providers marked online, offline and moved
+        """
+        batch_size = batch_size or settings.PROVIDER_PRESENCE['FLUSH_BATCH_SIZE']
+        presence_store.prune()
+        online = presence_store.online()
+        available = {
+            str(provider_id)
+            for provider_id in ServiceProviderProfile.objects.filter(
+                is_available=True
+            ).values_list('id', flat=True)
+        }
+        # bulk_update and update() skip auto_now, but the locator polls updated_at
+        now = timezone.now()
+
+        went_online = sorted(set(online) - available)
+        went_offline = sorted(available - set(online))
+        for ids, is_available in ((went_online, True), (went_offline, False)):
+            for start in range(0, len(ids), batch_size):
+                ServiceProviderProfile.objects.filter(
+                    pk__in=ids[start:start + batch_size]
+                ).update(is_available=is_available, updated_at=now)
+
+        moved = 0
+        online_ids = sorted(online)
+        for start in range(0, len(online_ids), batch_size):
+            providers = ServiceProviderProfile.objects.filter(
+                pk__in=online_ids[start:start + batch_size]
+            ).only('id', 'latitude', 'longitude', 'geohash')
+            changed = []
+            for provider in providers:
+                latitude, longitude = online[str(provider.pk)]
+                geohash = geohash_encode(latitude, longitude)
+                # Movement within a geohash cell (about 5 m) is not worth a write
+                if provider.geohash != geohash:
+                    provider.latitude, provider.longitude = latitude, longitude
+                    provider.geohash = geohash
+                    provider.updated_at = now
+                    changed.append(provider)
+            ServiceProviderProfile.objects.bulk_update(
+                changed, ['latitude', 'longitude', 'geohash', 'updated_at']
+            )
+            moved += len(changed)
+
+        return {'online': len(went_online), 'offline': len(went_offline), 'moved': moved}
@@ -0,0 +1,248 @@
+import hashlib
+import hmac
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from ..choices import EMAIL_VERIFICATION, PHONE_VERIFICATION
+
+logger = logging.getLogger(__name__)
+
+
+class BaseVerificationCodeBackend:
+    """
+    Key/value primitives the verification code store is built on.
+    `add` and `incr` must be atomic so concurrent checks can't race past the limits.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, timeout):
+        raise NotImplementedError
+
+    def add(self, key, value, timeout):
+        """Set the key only if it does not exist. Returns True if it was set."""
+        raise NotImplementedError
+
+    def incr(self, key, timeout):
+        """Increment a counter, creating it with the given timeout if missing."""
+        raise NotImplementedError
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+
+class CacheVerificationCodeBackend(BaseVerificationCodeBackend):
+    """
+    Backend on a Django cache alias. With the Redis cache backend `add` maps to
+    SET NX and `incr` to INCRBY, so it is safe to share between workers.
+    """
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout):
+        self.cache.set(key, value, timeout)
+
+    def add(self, key, value, timeout):
+        return self.cache.add(key, value, timeout)
+
+    def incr(self, key, timeout):
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # The counter expired between add and incr
+            self.cache.add(key, 0, timeout)
+            return self.cache.incr(key)
+
+    def delete(self, *keys):
+        self.cache.delete_many(keys)
+
+
+class InMemoryVerificationCodeBackend(BaseVerificationCodeBackend):
+    """
+    Process-local backend for tests and local development.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _get_live(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._get_live(key)
+            return entry[0] if entry else None
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+
+    def add(self, key, value, timeout):
+        with self._lock:
+            if self._get_live(key) is not None:
+                return False
+            self._data[key] = (value, time.monotonic() + timeout)
+            return True
+
+    def incr(self, key, timeout):
+        with self._lock:
+            entry = self._get_live(key)
+            if entry is None:
+                entry = (0, time.monotonic() + timeout)
+            value = entry[0] + 1
+            self._data[key] = (value, entry[1])
+            return value
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class VerificationCodeStore:
+    """
+    Stores hashed verification codes with a TTL, an attempt counter and a resend
+    cooldown per user and purpose. Checking a code never touches the database.
+    """
+
+    CODE_KEY = 'verification_code:{purpose}:{user_id}'
+    ATTEMPTS_KEY = 'verification_attempts:{purpose}:{user_id}'
+    COOLDOWN_KEY = 'verification_cooldown:{purpose}:{user_id}'
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def config(self):
+        return settings.VERIFICATION_CODES
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = import_string(self.config['BACKEND'])()
+        return self._backend
+
+    def _keys(self, user_id, purpose):
+        return (
+            self.CODE_KEY.format(purpose=purpose, user_id=user_id),
+            self.ATTEMPTS_KEY.format(purpose=purpose, user_id=user_id),
+        )
+
+    @staticmethod
+    def _hash(user_id, purpose, code):
+        message = f'{purpose}:{user_id}:{code}'.encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    def issue(self, user_id, purpose, code):
+        """
+        Store a new code for the user, replacing any previous one.
+        """
+        code_key, attempts_key = self._keys(user_id, purpose)
+        self.backend.delete(attempts_key)
+        self.backend.set(code_key, self._hash(user_id, purpose, code), self.config['CODE_TTL'])
+
+    def start_cooldown(self, user_id, purpose):
+        """
+        Start the resend cooldown. Returns False if one is already running.
+        """
+        cooldown_key = self.COOLDOWN_KEY.format(purpose=purpose, user_id=user_id)
+        return self.backend.add(cooldown_key, 1, self.config['RESEND_COOLDOWN'])
+
+    def verify(self, user_id, purpose, code):
+        """
+        Check a code. The code is consumed on success and discarded once the
+        maximum number of attempts is exceeded.
+        """
+        code_key, attempts_key = self._keys(user_id, purpose)
+        code_hash = self.backend.get(code_key)
+        if code_hash is None:
+            return False
+
+        attempts = self.backend.incr(attempts_key, self.config['CODE_TTL'])
+        if attempts > self.config['MAX_ATTEMPTS']:
+            self.backend.delete(code_key, attempts_key)
+            return False
+
+        if not hmac.compare_digest(code_hash, self._hash(user_id, purpose, code)):
+            return False
+
+        self.backend.delete(code_key, attempts_key)
+        return True
+
+
+verification_code_store = VerificationCodeStore()
+
+
+class VerificationService:
+    """
+    Service class for checking and resending email and phone verification codes.
+    """
+
+    @staticmethod
+    def verify_email_code(user, code):
+        from .account import AccountService
+
+        return AccountService.verify_email(user, code)
+
+    @staticmethod
+    def verify_phone_code(user, code):
+        from .account import AccountService
+
+        return AccountService.verify_phone(user, code)
+
+    @classmethod
+    def resend_email_verification(cls, user):
+        """
+        Issue a new email verification code and queue it for sending.
+
+        Args:
+            user: User object
+        """
+        from .account import AccountService
+
+        if user.email_verified:
+            raise ValueError('Email address is already verified.')
+        if not verification_code_store.start_cooldown(user.pk, EMAIL_VERIFICATION):
+            raise ValueError('Please wait before requesting a new code.')
+
+        code = AccountService.generate_verification_code()
+        verification_code_store.issue(user.pk, EMAIL_VERIFICATION, code)
+        AccountService.dispatch_email_verification(user, code)
+
+    @classmethod
+    def resend_phone_verification(cls, user):
+        """
+        Issue a new phone verification code and queue it for sending.
+
+        Args:
+            user: User object
+        """
+        from .account import AccountService
+
+        if user.phone_number_verified:
+            raise ValueError('Phone number is already verified.')
+        if not verification_code_store.start_cooldown(user.pk, PHONE_VERIFICATION):
+            raise ValueError('Please wait before requesting a new code.')
+
+        code = AccountService.generate_verification_code()
+        verification_code_store.issue(user.pk, PHONE_VERIFICATION, code)
+        AccountService.dispatch_phone_verification(user, code)
@@ -0,0 +1,97 @@
+import logging
+
+from celery import Task, shared_task
+from django.contrib.auth import get_user_model
+
+from utilities.general import create_failed_task_log
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+class NotificationTask(Task):
+    """
+    Base task for outbound notifications. Retries with exponential backoff and
+    records the final failure in TaskLog as a dead letter.
+    """
+
+    autoretry_for = (Exception,)
+    retry_backoff = True
+    retry_backoff_max = 600
+    retry_jitter = True
+    max_retries = 5
+
+    # Never persist these in TaskLog
+    secret_kwargs = ("verification_code",)
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        logger.error(f"{self.name} failed permanently: {str(exc)}")
+        create_failed_task_log(
+            checkpoint=self.name,
+            message=str(exc),
+            data_details={
+                "task_id": task_id,
+                "retries": self.request.retries,
+                "kwargs": {
+                    key: value
+                    for key, value in kwargs.items()
+                    if key not in self.secret_kwargs
+                },
+            },
+        )
+
+
+@shared_task(base=NotificationTask)
+def send_email_verification(user_id, verification_code):
+    from apps.core.services.account import AccountService
+
+    try:
+        user = User.objects.get(pk=user_id)
+    except User.DoesNotExist:
+        logger.warning(f"Skipping email verification for missing user {user_id}")
+        return
+
+    AccountService.send_email_verification(user, verification_code)
+
+
+@shared_task(base=NotificationTask)
+def send_phone_verification(user_id, verification_code):
+    from apps.core.services.account import AccountService
+
+    try:
+        user = User.objects.get(pk=user_id)
+    except User.DoesNotExist:
+        logger.warning(f"Skipping phone verification for missing user {user_id}")
+        return
+
+    AccountService.send_phone_verification(user, verification_code)
+
+
+@shared_task
+def optimize_profile_photo(profile_id, photo_name, model="core.CustomerProfile"):
+    """
+    Replace an uploaded profile photo with its optimized variants.
+    """
+    from apps.core.services.photo import ProfilePhotoService
+
+    return ProfilePhotoService.optimize(model, profile_id, photo_name)
+
+
+@shared_task
+def flush_provider_presence():
+    """
+    Write provider presence from heartbeats back to the database in batches.
+    """
+    from apps.core.services.provider import ProviderPresenceService
+
+    return ProviderPresenceService.flush()
+
+
+@shared_task
+def assign_pending_jobs():
+    """
+    Assign the jobs that collected in the dispatch queue since the last window.
+    """
+    from apps.core.services.dispatch import DispatchService
+
+    return DispatchService.assign_pending()
@@ -0,0 +1,780 @@
+import io
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+from datetime import date
+from unittest import mock
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files import File
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from PIL import Image
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.common.middleware import BlacklistMiddleware
+from apps.common.models import StoredBlob
+from apps.common.revocation import RevocationStore
+from apps.core.choices import CUSTOMER, EMAIL_VERIFICATION, PHONE_VERIFICATION, SERVICE_PROVIDER
+from apps.core.dispatch import DispatchQueue
+from apps.core.locator import ProviderLocator
+from apps.core.management.commands.import_users import Command as ImportUsersCommand
+from apps.core.models import CustomerProfile, ServiceProviderProfile, User
+from apps.core.presence import PresenceStore
+from apps.core.services.dispatch import DispatchService
+from apps.core.services.password import PasswordService
+from apps.core.services.photo import OPTIMIZED, ProfilePhotoService
+from apps.core.services.provider import ProviderSearchService
+from apps.core.throttling import VerificationRateThrottle
+from apps.core.services.verification import (
+    InMemoryVerificationCodeBackend,
+    VerificationCodeStore,
+)
+from utilities import images
+from utilities.rate_limit import TokenBucketRateLimiter
+from utilities.sms import CircuitBreaker, CircuitOpenError
+
+LOCAL_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class DispatchLoadTests(SimpleTestCase):
+    def setUp(self):
+        self.queue = DispatchQueue()
+        self.now = 1_000_000.0
+        self.addCleanup(cache.clear)
+        patcher = mock.patch("apps.core.services.dispatch.dispatch_queue", self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("apps.core.dispatch.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # A single online provider next to every job
+        patcher = mock.patch.object(
+            DispatchService,
+            "candidate_providers",
+            return_value=(["provider"], np.array([[6.5, 3.4]]), np.array([5.0])),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, count):
+        return [DispatchService.submit_job(6.5, 3.4) for _ in range(count)]
+
+    def test_provider_at_max_load_is_skipped_across_windows(self):
+        max_load = self.queue.config["MAX_LOAD"]
+        assigned = []
+        for _ in range(max_load + 2):
+            job_id = self.submit(1)[0]
+            DispatchService.assign_pending()
+            assigned.append(self.queue.assignment_for(job_id))
+
+        self.assertEqual(assigned[:max_load], ["provider"] * max_load)
+        self.assertEqual(assigned[max_load:], [None, None])
+        self.assertEqual(self.queue.loads(["provider"]), [max_load])
+        self.assertEqual(len(self.queue), 2)
+
+    def test_released_job_frees_the_provider(self):
+        max_load = self.queue.config["MAX_LOAD"]
+        job_ids = self.submit(max_load + 1)
+        for _ in job_ids:
+            DispatchService.assign_pending(batch_size=1)
+        self.assertEqual(len(self.queue), 1)
+
+        self.queue.release("provider", job_ids[0])
+        result = DispatchService.assign_pending()
+
+        self.assertEqual(result["assigned"], 1)
+        self.assertEqual(self.queue.assignment_for(job_ids[-1]), "provider")
+
+    def test_unreleased_jobs_time_out(self):
+        max_load = self.queue.config["MAX_LOAD"]
+        self.submit(max_load + 1)
+        for _ in range(max_load + 1):
+            DispatchService.assign_pending(batch_size=1)
+        self.assertEqual(self.queue.loads(["provider"]), [max_load])
+
+        self.now += self.queue.config["ASSIGNMENT_TTL_SECONDS"] + 1
+        self.assertEqual(self.queue.loads(["provider"]), [0])
+        self.assertEqual(DispatchService.assign_pending()["assigned"], 1)
+
+    def test_failed_window_requeues_taken_jobs(self):
+        job_ids = self.submit(2)
+        with mock.patch.object(DispatchService, "solve", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                DispatchService.assign_pending()
+
+        self.assertEqual([job["id"] for job in self.queue.take(10)], job_ids)
+
+    def test_queue_is_shared_through_the_cache(self):
+        job_ids = self.submit(2)
+        other = DispatchQueue()
+        other.record_assignments([(job_ids[0], "provider")])
+
+        self.assertEqual([job["id"] for job in other.take(10)], job_ids)
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(self.queue.loads(["provider"]), [1])
+        self.assertEqual(self.queue.assignment_for(job_ids[0]), "provider")
+
+
+class PasswordServiceTests(SimpleTestCase):
+    def test_async_hash_and_check_round_trip(self):
+        user = User(password=async_to_sync(PasswordService.ahash_password)("s3cret pass"))
+
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$"))
+        self.assertTrue(async_to_sync(PasswordService.acheck_password)(user, "s3cret pass"))
+        self.assertFalse(async_to_sync(PasswordService.acheck_password)(user, "wrong pass"))
+
+
+class GenerateVariantsTests(SimpleTestCase):
+    sizes = {"full": (800, 800), "medium": (400, 400), "thumb": (128, 128)}
+
+    def upload(self, size, image_format="JPEG"):
+        output = io.BytesIO()
+        Image.new("RGB", size, "teal").save(output, format=image_format)
+        output.seek(0)
+        return File(output, name=f"photo.{image_format.lower()}")
+
+    def generate(self, upload, formats=("jpeg",)):
+        with mock.patch.object(images, "open_image", wraps=images.open_image) as open_image:
+            variants = images.generate_variants(
+                upload, self.sizes, formats=formats, max_bytes=300 * 1024
+            )
+        return variants, open_image
+
+    def test_variants_that_fit_are_not_decoded_or_encoded(self):
+        upload = self.upload((120, 100))
+        variants, open_image = self.generate(upload)
+
+        open_image.assert_not_called()
+        self.assertIs(variants["full"]["jpeg"], upload)
+        self.assertEqual(variants["thumb"]["jpeg"].read(), upload.file.getvalue())
+
+    def test_one_decode_at_the_largest_size_to_encode(self):
+        upload = self.upload((300, 200))
+        variants, open_image = self.generate(upload, formats=("jpeg", "webp"))
+
+        open_image.assert_called_once_with(upload, (800, 800))
+        self.assertIs(variants["full"]["jpeg"], upload)
+        self.assertEqual(variants["medium"]["jpeg"].read(), upload.file.getvalue())
+        self.assertEqual(Image.open(variants["medium"]["webp"]).size, (300, 200))
+        self.assertEqual(Image.open(variants["thumb"]["jpeg"]).size, (128, 85))
+
+    def test_large_upload_is_resized_largest_first(self):
+        upload = self.upload((1600, 1200), image_format="PNG")
+        variants, open_image = self.generate(upload)
+
+        open_image.assert_called_once_with(upload, (800, 800))
+        self.assertEqual(
+            {variant: Image.open(formats["jpeg"]).size for variant, formats in variants.items()},
+            {"full": (800, 600), "medium": (400, 300), "thumb": (128, 96)},
+        )
+
+
+def _write_sample(path, size, image_format, mode):
+    # Noise upscaled to a photo-like gradient, cheap to generate at any size
+    noise = Image.effect_noise((size[0] // 16, size[1] // 16), 64)
+    sample = Image.merge("RGB", (noise, noise.rotate(180), noise.transpose(0)))
+    if mode == "P":
+        sample = sample.quantize(64).resize(size, Image.NEAREST)
+    else:
+        sample = sample.resize(size, Image.BILINEAR)
+    sample.save(path, format=image_format)
+
+
+def _measure_open_image(path, max_size, results):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    images.open_image(path, max_size)
+    # ru_maxrss is in kilobytes on Linux
+    results.put((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) * 1024)
+
+
+class OpenImageMemoryTests(SimpleTestCase):
+    """
+    Peak memory of decoding a 12 MP upload to a 400 px box. Only JPEG avoids
+    the full-resolution decode; palette images must not be expanded to RGBA
+    before they are shrunk.
+    """
+
+    size = (4000, 3000)
+    max_size = (400, 400)
+    # What holding the whole image as RGB or RGBA costs, 4 bytes a pixel
+    full_bitmap = size[0] * size[1] * 4
+
+    def setUp(self):
+        # Each step runs in a fresh process so its peak RSS is its own
+        self.context = multiprocessing.get_context("fork")
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.directory = directory
+
+    def peak_bytes(self, image_format, mode="RGB"):
+        path = os.path.join(self.directory, f"sample.{image_format.lower()}")
+        process = self.context.Process(
+            target=_write_sample, args=(path, self.size, image_format, mode)
+        )
+        process.start()
+        process.join()
+
+        results = self.context.Queue()
+        process = self.context.Process(
+            target=_measure_open_image, args=(path, self.max_size, results)
+        )
+        process.start()
+        peak = results.get(timeout=60)
+        process.join()
+        return peak
+
+    def test_jpeg_is_decoded_at_reduced_scale(self):
+        self.assertLess(self.peak_bytes("JPEG"), self.full_bitmap / 3)
+
+    def test_palette_png_is_shrunk_before_conversion(self):
+        self.assertLess(self.peak_bytes("PNG", mode="P"), self.full_bitmap / 2)
+
+
+class VerificationCodeStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.store = VerificationCodeStore(InMemoryVerificationCodeBackend())
+        self.now = 1_000.0
+        patcher = mock.patch("apps.core.services.verification.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_code_is_verified_once(self):
+        self.store.issue(1, EMAIL_VERIFICATION, "123456")
+
+        self.assertFalse(self.store.verify(1, PHONE_VERIFICATION, "123456"))
+        self.assertFalse(self.store.verify(2, EMAIL_VERIFICATION, "123456"))
+        self.assertTrue(self.store.verify(1, EMAIL_VERIFICATION, "123456"))
+        self.assertFalse(self.store.verify(1, EMAIL_VERIFICATION, "123456"))
+
+    def test_code_is_stored_hashed(self):
+        self.store.issue(1, EMAIL_VERIFICATION, "123456")
+        stored = self.store.backend.get(f"verification_code:{EMAIL_VERIFICATION}:1")
+
+        self.assertNotIn("123456", stored)
+        self.assertEqual(len(stored), 64)
+
+    def test_code_expires(self):
+        self.store.issue(1, EMAIL_VERIFICATION, "123456")
+        self.now += self.store.config["CODE_TTL"]
+
+        self.assertFalse(self.store.verify(1, EMAIL_VERIFICATION, "123456"))
+
+    def test_code_is_discarded_after_max_attempts(self):
+        self.store.issue(1, EMAIL_VERIFICATION, "123456")
+        for _ in range(self.store.config["MAX_ATTEMPTS"]):
+            self.assertFalse(self.store.verify(1, EMAIL_VERIFICATION, "000000"))
+
+        self.assertFalse(self.store.verify(1, EMAIL_VERIFICATION, "123456"))
+
+    def test_new_code_resets_attempts(self):
+        self.store.issue(1, EMAIL_VERIFICATION, "111111")
+        for _ in range(self.store.config["MAX_ATTEMPTS"] - 1):
+            self.store.verify(1, EMAIL_VERIFICATION, "000000")
+        self.store.issue(1, EMAIL_VERIFICATION, "222222")
+
+        self.assertFalse(self.store.verify(1, EMAIL_VERIFICATION, "111111"))
+        self.assertTrue(self.store.verify(1, EMAIL_VERIFICATION, "222222"))
+
+    def test_resend_cooldown(self):
+        self.assertTrue(self.store.start_cooldown(1, EMAIL_VERIFICATION))
+        self.assertFalse(self.store.start_cooldown(1, EMAIL_VERIFICATION))
+        self.assertTrue(self.store.start_cooldown(1, PHONE_VERIFICATION))
+
+        self.now += self.store.config["RESEND_COOLDOWN"]
+        self.assertTrue(self.store.start_cooldown(1, EMAIL_VERIFICATION))
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class TokenBucketRateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.limiter = TokenBucketRateLimiter()
+        self.now = 1_000_000.0
+        patcher = mock.patch("utilities.rate_limit.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(cache.clear)
+
+    def test_bucket_empties_and_refills(self):
+        for _ in range(5):
+            self.assertEqual(self.limiter.consume([("phone", "5/h")]), (True, 0.0))
+
+        allowed, retry_after = self.limiter.consume([("phone", "5/h")])
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 720)
+
+        self.now += 720
+        self.assertTrue(self.limiter.consume([("phone", "5/h")])[0])
+        self.assertFalse(self.limiter.consume([("phone", "5/h")])[0])
+
+    def test_denied_request_takes_no_tokens(self):
+        self.limiter.consume([("user", "1/h")])
+        for _ in range(3):
+            self.assertFalse(self.limiter.consume([("ip", "3/h"), ("user", "1/h")])[0])
+
+        # The ip bucket was checked three times but never drawn from
+        for _ in range(3):
+            self.assertTrue(self.limiter.consume([("ip", "3/h")])[0])
+        self.assertFalse(self.limiter.consume([("ip", "3/h")])[0])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class VerificationRateThrottleTests(TestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+    def allow(self, user_id, ip="10.0.0.1"):
+        request = APIRequestFactory().post(
+            "/", {"type": "email", "user_id": user_id}, format="json", REMOTE_ADDR=ip
+        )
+        throttle = VerificationRateThrottle()
+        return throttle.allow_request(Request(request, parsers=[JSONParser()]), None), throttle
+
+    def test_resends_are_limited_per_user(self):
+        user_id = "00000000-0000-0000-0000-000000000001"
+        for _ in range(10):
+            self.assertTrue(self.allow(user_id)[0])
+
+        allowed, throttle = self.allow(user_id, ip="10.0.0.2")
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 360, delta=1)
+        self.assertTrue(self.allow("00000000-0000-0000-0000-000000000002")[0])
+
+    def test_resends_are_limited_per_ip(self):
+        for number in range(30):
+            self.assertTrue(self.allow(f"00000000-0000-0000-0000-{number:012d}")[0])
+
+        self.assertFalse(self.allow("00000000-0000-0000-0000-000000000099")[0])
+        self.assertTrue(self.allow("00000000-0000-0000-0000-000000000099", ip="10.0.0.2")[0])
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        self.now = 1_000.0
+        patcher = mock.patch("utilities.sms.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fail(self, times):
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.fail(2)
+        self.breaker.record_success()
+        self.fail(2)
+        self.breaker.before_call()
+
+        self.breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_half_open_lets_one_trial_through(self):
+        self.fail(3)
+        self.now += 30
+
+        self.breaker.before_call()
+        # Further calls wait for the trial's outcome
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        self.breaker.record_success()
+        self.breaker.before_call()
+
+    def test_failed_trial_reopens(self):
+        self.fail(3)
+        self.now += 30
+
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.now += 29
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.now += 1
+        self.breaker.before_call()
+
+
+class StoredBlobReferenceTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media_root = media_root
+        # Uploads queue a background optimization once committed
+        patcher = mock.patch("apps.core.tasks.optimize_profile_photo.delay")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_customer(self, number):
+        user = User.objects.create_user(
+            full_name=f"Customer {number}",
+            email=f"customer{number}@example.com",
+            phone_number=f"+234800000{number:04d}",
+            password="correct horse battery staple",
+            user_type=CUSTOMER,
+        )
+        return CustomerProfile.objects.create(user=user, date_of_birth=date(1990, 1, 1))
+
+    def upload(self, profile, content, name="photo.jpg"):
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.profile_photo = SimpleUploadedFile(name, content)
+            profile.save()
+        return profile.profile_photo.name
+
+    def blob_files(self):
+        return [
+            name
+            for _, _, names in os.walk(os.path.join(self.media_root, "blobs"))
+            for name in names
+        ]
+
+    def test_duplicate_upload_shares_one_blob(self):
+        first = self.upload(self.create_customer(1), b"same bytes")
+        second = self.upload(self.create_customer(2), b"same bytes")
+
+        self.assertEqual(first, second)
+        self.assertEqual(StoredBlob.objects.get(name=first).ref_count, 2)
+        self.assertEqual(len(self.blob_files()), 1)
+
+    def test_replacing_a_photo_releases_the_old_blob(self):
+        profile = self.create_customer(1)
+        old_name = self.upload(profile, b"old photo")
+        new_name = self.upload(profile, b"new photo")
+
+        self.assertFalse(StoredBlob.objects.filter(name=old_name).exists())
+        self.assertEqual(StoredBlob.objects.get(name=new_name).ref_count, 1)
+        self.assertEqual(self.blob_files(), [os.path.basename(new_name)])
+
+    def test_uploading_the_same_photo_again_keeps_one_reference(self):
+        profile = self.create_customer(1)
+        name = self.upload(profile, b"same photo")
+        self.upload(profile, b"same photo")
+
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 1)
+
+    def test_replacing_an_optimized_photo_releases_its_variants(self):
+        profile = self.create_customer(1)
+        output = io.BytesIO()
+        Image.new("RGB", (1600, 1200), "teal").save(output, format="PNG")
+        photo_name = self.upload(profile, output.getvalue(), name="photo.png")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = ProfilePhotoService.optimize(profile._meta.label, profile.pk, photo_name)
+        self.assertEqual(result["outcome"], OPTIMIZED)
+        # The optimized photo and its other variants, the original is gone
+        self.assertEqual(StoredBlob.objects.count(), 1)
+        self.assertEqual(len(self.blob_files()), len(profile.photo_variant_names(photo_name)))
+
+        profile.refresh_from_db()
+        new_name = self.upload(profile, b"new photo")
+        self.assertEqual(list(StoredBlob.objects.values_list("name", flat=True)), [new_name])
+        self.assertEqual(self.blob_files(), [os.path.basename(new_name)])
+
+    def test_replacing_a_shared_photo_keeps_the_other_reference(self):
+        shared = self.upload(self.create_customer(1), b"shared photo")
+        profile = self.create_customer(2)
+        self.upload(profile, b"shared photo")
+        self.upload(profile, b"own photo")
+
+        self.assertEqual(StoredBlob.objects.get(name=shared).ref_count, 1)
+
+    def test_clearing_and_deleting_release_blobs(self):
+        cleared = self.create_customer(1)
+        cleared_name = self.upload(cleared, b"cleared photo")
+        deleted = self.create_customer(2)
+        deleted_name = self.upload(deleted, b"deleted photo")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cleared.profile_photo = None
+            cleared.save()
+            deleted.delete()
+
+        self.assertFalse(StoredBlob.objects.filter(name__in=[cleared_name, deleted_name]).exists())
+        self.assertEqual(self.blob_files(), [])
+
+    def test_identification_document_is_released(self):
+        user = User.objects.create_user(
+            full_name="Provider",
+            email="provider@example.com",
+            phone_number="+2348000009999",
+            password="correct horse battery staple",
+            user_type=SERVICE_PROVIDER,
+        )
+        provider = ServiceProviderProfile.objects.create(user=user, business_name="Provider")
+        with self.captureOnCommitCallbacks(execute=True):
+            provider.identification_document = SimpleUploadedFile("id.pdf", b"first id")
+            provider.save()
+        old_name = provider.identification_document.name
+        with self.captureOnCommitCallbacks(execute=True):
+            provider.identification_document = SimpleUploadedFile("id.pdf", b"second id")
+            provider.save()
+
+        self.assertFalse(StoredBlob.objects.filter(name=old_name).exists())
+        self.assertEqual(len(self.blob_files()), 1)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class PresenceStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1_000_000.0
+        patcher = mock.patch("apps.core.presence.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(cache.clear)
+
+    def test_presence_is_shared_through_the_cache(self):
+        writer, reader = PresenceStore(), PresenceStore()
+        writer.heartbeat("near", 6.5, 3.4)
+        writer.heartbeat("far", 9.1, 7.5)
+
+        self.assertEqual(reader.online_in_box(6.4, 6.6, 3.3, 3.5), {"near": (6.5, 3.4)})
+        reader.go_offline("near")
+        self.assertEqual(writer.online(), {"far": (9.1, 7.5)})
+
+    def test_stale_providers_drop_out_and_are_pruned(self):
+        presence = PresenceStore()
+        presence.heartbeat("stale", 6.5, 3.4)
+        self.now += presence.config["TTL_SECONDS"] + 1
+        presence.heartbeat("fresh", 6.5, 3.4)
+
+        self.assertEqual(presence.online(), {"fresh": (6.5, 3.4)})
+        presence.prune()
+        self.assertEqual(list(cache.get("presence:locations")), ["fresh"])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class ProviderLocatorTests(TestCase):
+    def setUp(self):
+        self.locator = ProviderLocator()
+        self.presence = PresenceStore()
+        self.addCleanup(cache.clear)
+        for target in (
+            "apps.core.locator.provider_locator",
+            "apps.core.services.dispatch.provider_locator",
+            "apps.core.services.provider.provider_locator",
+        ):
+            patcher = mock.patch(target, self.locator)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for target in (
+            "apps.core.services.dispatch.presence_store",
+            "apps.core.services.provider.presence_store",
+        ):
+            patcher = mock.patch(target, self.presence)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def create_provider(self, number, is_verified, rating="4.50"):
+        user = User.objects.create_user(
+            full_name=f"Provider {number}",
+            email=f"provider{number}@example.com",
+            phone_number=f"+234800000{number:04d}",
+            password="correct horse battery staple",
+            user_type=SERVICE_PROVIDER,
+        )
+        return ServiceProviderProfile.objects.create(
+            user=user,
+            business_name=f"Provider {number}",
+            is_verified=is_verified,
+            average_rating=rating,
+        )
+
+    def test_only_online_verified_providers_are_candidates(self):
+        verified = self.create_provider(1, is_verified=True)
+        unverified = self.create_provider(2, is_verified=False)
+        self.create_provider(3, is_verified=True)
+        self.presence.heartbeat(verified.pk, 6.5, 3.4)
+        self.presence.heartbeat(unverified.pk, 6.5001, 3.4)
+
+        provider_ids, positions, ratings = DispatchService.candidate_providers(
+            np.array([[6.5, 3.4]])
+        )
+
+        self.assertEqual(provider_ids, [str(verified.pk)])
+        self.assertEqual(positions.tolist(), [[6.5, 3.4]])
+        self.assertEqual(ratings.tolist(), [4.5])
+
+        nearest = ProviderSearchService.nearest_available(6.5, 3.4, k=5)
+        self.assertEqual([provider.pk for provider in nearest], [verified.pk])
+        self.assertEqual(nearest[0].distance_km, 0)
+
+    def test_verification_change_reaches_the_locator_on_commit(self):
+        provider = self.create_provider(1, is_verified=False)
+        self.presence.heartbeat(provider.pk, 6.5, 3.4)
+        self.assertEqual(ProviderSearchService.nearest_available(6.5, 3.4), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            provider.is_verified = True
+            provider.save()
+
+        nearest = ProviderSearchService.nearest_available(6.5, 3.4)
+        self.assertEqual([provider.pk for provider in nearest], [provider.pk])
+
+
+class AccessTokenTests(TestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        self.revocation_store = RevocationStore()
+        patcher = mock.patch("apps.common.middleware.revocation_store", self.revocation_store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(
+            full_name="Customer",
+            email="customer@example.com",
+            phone_number="+2348000000001",
+            password="correct horse battery staple",
+            user_type=CUSTOMER,
+        )
+
+    def check(self, access):
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {access}")
+        return BlacklistMiddleware(lambda request: None).process_request(request)
+
+    def assertRevoked(self, access):
+        response = self.check(access)
+        self.assertIsNotNone(response)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn(b"Revoked access token", response.content)
+
+    def test_revoked_token_is_rejected(self):
+        revoked = self.user.tokens()["access"]
+        other = self.user.tokens()["access"]
+        self.assertIsNone(self.check(revoked))
+
+        self.revocation_store.revoke_access_token(AccessToken(revoked))
+
+        self.assertRevoked(revoked)
+        self.assertIsNone(self.check(other))
+
+    def test_revocation_is_rebuilt_from_the_database(self):
+        access = self.user.tokens()["access"]
+        self.revocation_store.revoke_access_token(AccessToken(access))
+        cache.clear()
+
+        # A worker starting on an empty cache
+        self.revocation_store = RevocationStore()
+        with mock.patch("apps.common.middleware.revocation_store", self.revocation_store):
+            self.assertRevoked(access)
+            self.assertIsNone(self.check(self.user.tokens()["access"]))
+
+    def test_password_change_rejects_earlier_tokens(self):
+        old = self.user.tokens()["access"]
+        self.assertIsNone(self.check(old))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password("a brand new passphrase")
+            self.user.save()
+
+        self.assertRevoked(old)
+        self.assertIsNone(self.check(self.user.tokens()["access"]))
+
+    def test_rehash_on_login_keeps_tokens(self):
+        access = self.user.tokens()["access"]
+        old_hash = self.user.password
+        with mock.patch(
+            "django.contrib.auth.hashers.PBKDF2PasswordHasher.must_update", return_value=True
+        ):
+            self.assertTrue(self.user.check_password("correct horse battery staple"))
+
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.password, old_hash)
+        self.assertEqual(self.user.token_epoch, 0)
+        self.assertIsNone(self.check(access))
+
+    def test_revoke_all_tokens(self):
+        first = self.user.tokens()["access"]
+        second = self.user.tokens()["access"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.revoke_all_tokens()
+
+        self.assertRevoked(first)
+        self.assertRevoked(second)
+        self.assertIsNone(self.check(self.user.tokens()["access"]))
+
+
+class ImportUsersTests(TestCase):
+    rows = [
+        ("Ada", "ada@example.com", "+2348000000001"),
+        ("Bola", "bola@example.com", "+2348000000002"),
+        ("Chidi", "chidi@example.com", "+2348000000003"),
+    ]
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, "users.csv")
+        self.report = os.path.join(directory, "rejected.csv")
+        with open(self.path, "w") as stream:
+            stream.write("full_name,email,phone_number,date_of_birth,password\n")
+            for full_name, email, phone_number in self.rows:
+                stream.write(f"{full_name},{email},{phone_number},1990-01-01,secret pass\n")
+
+    def signup(self, email, phone_number):
+        User.objects.create_user(
+            full_name="Concurrent signup",
+            email=email,
+            phone_number=phone_number,
+            password="correct horse battery staple",
+            user_type=CUSTOMER,
+        )
+
+    def import_users(self):
+        call_command(
+            "import_users", self.path, workers=1, duplicates_report=self.report,
+            stdout=io.StringIO(),
+        )
+        with open(self.report) as stream:
+            return [row.strip().split(",") for row in stream.readlines()[1:]]
+
+    def test_existing_users_are_reported(self):
+        self.signup("bola@example.com", "+2348000009999")
+
+        rejected = self.import_users()
+
+        self.assertEqual(
+            rejected, [["2", "bola@example.com", "+2348000000002", "duplicate email"]]
+        )
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_signups_racing_the_insert_are_reported_per_row(self):
+        filter_duplicates = ImportUsersCommand.filter_duplicates
+        conflicts = [
+            ("bola@example.com", "+2348000009998"),
+            ("chidi.other@example.com", "+2348000000003"),
+        ]
+
+        def check_then_race(command, chunk):
+            accepted = filter_duplicates(command, chunk)
+            # Each check of the whole chunk is followed by a conflicting signup
+            if len(chunk) > 1 and conflicts:
+                self.signup(*conflicts.pop(0))
+            return accepted
+
+        with mock.patch.object(ImportUsersCommand, "filter_duplicates", check_then_race):
+            rejected = self.import_users()
+
+        self.assertEqual(
+            rejected,
+            [
+                ["2", "bola@example.com", "+2348000000002", "duplicate email"],
+                ["3", "chidi@example.com", "+2348000000003", "duplicate phone_number"],
+            ],
+        )
+        self.assertEqual(
+            set(User.objects.values_list("email", flat=True)),
+            {"ada@example.com", "bola@example.com", "chidi.other@example.com"},
+        )
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+
+from apps.common.throttling import TokenBucketThrottle
+from .choices import PHONE_VERIFICATION
+
+User = get_user_model()
+
+
+class VerificationRateThrottle(TokenBucketThrottle):
+    """
+    Limits verification and resend requests per user, per phone number and per IP.
+    """
+
+    scope = 'verification'
+
+    def get_buckets(self, request, view):
+        user_id = request.data.get('user_id')
+        buckets = [('ip', self.get_ident(request)), ('user', user_id)]
+
+        # Phone resends cost an SMS, so also limit them per destination number
+        if request.data.get('type') == PHONE_VERIFICATION and user_id:
+            try:
+                phone_number = (
+                    User.objects.filter(pk=user_id)
+                    .values_list('phone_number', flat=True)
+                    .first()
+                )
+            except ValidationError:
+                phone_number = None
+            buckets.append(('phone', phone_number))
+
+        return buckets
+
+
+class HeartbeatRateThrottle(TokenBucketThrottle):
+    """
+    Limits provider heartbeats per user, well above the app's ping interval.
+    """
+
+    scope = 'heartbeat'
+
+    def get_buckets(self, request, view):
+        return [('user', request.user.pk)]
@@ -3,5 +3,5 @@ from django.urls import path
 from apps.core.views import *
 
 urlpatterns = [
-    
-]
\ No newline at end of file
+    path("providers/heartbeat/", ProviderHeartbeatView.as_view(), name="provider-heartbeat"),
+]
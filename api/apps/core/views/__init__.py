@@ -0,0 +1,2 @@
+from .account import *
+from .provider import *
@@ -2,15 +2,17 @@ from django.contrib.auth import get_user_model
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status, permissions
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.generics import CreateAPIView, UpdateAPIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
-from ..services.account_service import AccountService
-from ..services.verification_service import VerificationService
-from ..serializers.account_serializers import (
-    UserRegistrationSerializer,
+from ..services.account import AccountService
+from ..services.verification import VerificationService
+from ..throttling import VerificationRateThrottle
+from ..serializers.account import (
+    CustomerRegistrationSerializer,
     VerificationSerializer,
     CustomerProfileSerializer
 )
@@ -22,7 +24,7 @@ class CustomerRegistrationView(CreateAPIView):
     API view for customer registration
     """
     permission_classes = [AllowAny]
-    serializer_class = UserRegistrationSerializer
+    serializer_class = CustomerRegistrationSerializer
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -32,28 +34,27 @@ class CustomerRegistrationView(CreateAPIView):
         validated_data = serializer.validated_data
         
         try:
-            # Create user
-            user = AccountService.create_user(
+            # Create user, profile and tokens in one transaction
+            user, tokens = AccountService.register_customer(
                 email=validated_data['email'],
                 phone_number=validated_data['phone_number'],
                 full_name=validated_data['full_name'],
                 password=validated_data['password'],
-                user_type='customer'
-            )
-            
-            # Create customer profile
-            AccountService.create_customer_profile(
-                user=user,
-                date_of_birth=validated_data.get('date_of_birth')
+                date_of_birth=validated_data.get('date_of_birth'),
+                preferred_service_areas=validated_data.get('preferred_service_areas')
             )
             
             # Return success response
             return Response({
                 'status': 'success',
                 'message': 'Registration successful. Please verify your email and phone number.',
-                'user_id': user.id
+                'user_id': user.id,
+                'tokens': tokens
             }, status=status.HTTP_201_CREATED)
             
+        except ValidationError:
+            # Lost a race with a concurrent signup; report it like the serializer does
+            raise
         except Exception as e:
             return Response({
                 'status': 'error',
@@ -66,6 +67,7 @@ class EmailVerificationView(APIView):
     API view for email verification
     """
     permission_classes = [AllowAny]
+    throttle_classes = [VerificationRateThrottle]
     
     def post(self, request, *args, **kwargs):
         serializer = VerificationSerializer(data=request.data)
@@ -108,6 +110,7 @@ class PhoneVerificationView(APIView):
     API view for phone verification
     """
     permission_classes = [AllowAny]
+    throttle_classes = [VerificationRateThrottle]
     
     def post(self, request, *args, **kwargs):
         serializer = VerificationSerializer(data=request.data)
@@ -150,6 +153,7 @@ class ResendVerificationView(APIView):
     API view for resending verification codes
     """
     permission_classes = [AllowAny]
+    throttle_classes = [VerificationRateThrottle]
     
     def post(self, request, *args, **kwargs):
         verification_type = request.data.get('type')
@@ -0,0 +1,47 @@
+from rest_framework import status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..presence import presence_store
+from ..serializers.account import HeartbeatSerializer
+from ..throttling import HeartbeatRateThrottle
+
+
+class ProviderHeartbeatView(APIView):
+    """
+    API view for provider presence. The provider app POSTs its position
+    every 30 seconds while online and DELETEs when going offline; presence
+    is written back to the profile periodically, not on every request.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [HeartbeatRateThrottle]
+
+    def get_provider(self):
+        provider = getattr(self.request.user, 'provider_profile', None)
+        if provider is None:
+            raise PermissionDenied('Only service providers can report presence.')
+        return provider
+
+    def post(self, request, *args, **kwargs):
+        provider = self.get_provider()
+        serializer = HeartbeatSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        presence_store.heartbeat(
+            provider.pk,
+            serializer.validated_data['latitude'],
+            serializer.validated_data['longitude'],
+        )
+        return Response({
+            'status': 'success',
+            'ttl_seconds': presence_store.config['TTL_SECONDS']
+        }, status=status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        presence_store.go_offline(self.get_provider().pk)
+        return Response({
+            'status': 'success',
+            'message': 'You are now offline.'
+        }, status=status.HTTP_200_OK)
@@ -5,9 +5,9 @@ import os
 from celery import Celery
 
 # Set the default Django settings module for the 'celery' program.
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "viewme.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "nestwash.settings")
 
-app = Celery("viewme")
+app = Celery("nestwash")
 
 # Configure Celery using settings from Django settings.py.
 app.config_from_object("django.conf:settings", namespace="CELERY")
@@ -24,7 +24,16 @@ ALLOWED_HOSTS = [
 CSRF_TRUSTED_ORIGINS = ["https://" + host for host in ALLOWED_HOSTS]
 
 # Redis URL configuration for caching, fetched from environment
-# REDISCLOUD_URL = config("REDISCLOUD_URL")
+REDISCLOUD_URL = config("REDISCLOUD_URL")
+
+# Shared cache so every worker sees the same revocations
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDISCLOUD_URL,
+        "KEY_PREFIX": "nestwash",
+    }
+}
 
 # Database configuration (PostgresSQL) for production
 POSTGRES_USER = config("POSTGRES_USER")
@@ -62,7 +71,10 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER  # Default email sender address
 # Storage configuration
 STORAGES = {
     "default": {
-        "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage",  # Media files on Cloudinary
+        "BACKEND": "apps.common.storage.DeduplicatedStorage",  # Deduplicated uploads
+        "OPTIONS": {
+            "backend": "cloudinary_storage.storage.MediaCloudinaryStorage",  # Media files on Cloudinary
+        },
     },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedStaticFilesStorage",
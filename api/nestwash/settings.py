@@ -75,9 +75,17 @@ DEBUG_TOOLBAR_CONFIG = {
     "INTERCEPT_REDIRECTS": False,  # Prevent Debug Toolbar from intercepting redirects
 }
 
+# Token bucket rates used by apps.common.throttling.TokenBucketThrottle subclasses
+TOKEN_BUCKET_RATES = {
+    "verification_ip": "30/h",
+    "verification_user": "10/h",
+    "verification_phone": "5/h",
+    "heartbeat_user": "10/m",
+}
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.common.authentication.CachedJWTAuthentication",
     ),
     "COERCE_DECIMAL_TO_STRING": False,
     "EXCEPTION_HANDLER": "nestwash.apps.common.exception_handler.process_exception",  # noqa
@@ -160,6 +168,9 @@ SIMPLE_JWT = {
     "JTI_CLAIM": "jti",
 }
 
+# Number of verified access tokens each worker keeps to skip re-verifying signatures
+VERIFIED_TOKEN_CACHE_SIZE = 10_000
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -190,6 +201,55 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "KEY_PREFIX": "nestwash",
+    }
+}
+
+# Revocation store settings (revoked JTIs live in the cache, BlacklistedToken is the durable copy)
+TOKEN_REVOCATION = {
+    "FILTER_CAPACITY": 100_000,  # Expected number of live revocations
+    "FILTER_ERROR_RATE": 0.001,  # Bloom filter false positive rate
+    "FILTER_SYNC_SECONDS": 5,  # How often a worker checks the cache for a newer filter
+}
+
+# Verification codes are stored hashed in the cache, never in the database
+VERIFICATION_CODES = {
+    "BACKEND": "apps.core.services.verification.CacheVerificationCodeBackend",
+    "CODE_TTL": 60 * 10,  # Seconds a code stays valid
+    "MAX_ATTEMPTS": 5,  # Wrong guesses allowed before the code is discarded
+    "RESEND_COOLDOWN": 60,  # Seconds between two codes for the same purpose
+}
+
+
+# Password hashing
+# Work factors are tuned per host with `python manage.py tune_password_hashers`
+
+PASSWORD_HASHER_PARAMS = {
+    "PBKDF2_ITERATIONS": config("PASSWORD_PBKDF2_ITERATIONS", default=1_000_000, cast=int),
+    "ARGON2_TIME_COST": config("PASSWORD_ARGON2_TIME_COST", default=2, cast=int),
+    "ARGON2_MEMORY_COST": config("PASSWORD_ARGON2_MEMORY_COST", default=102400, cast=int),
+    "ARGON2_PARALLELISM": config("PASSWORD_ARGON2_PARALLELISM", default=8, cast=int),
+    "BCRYPT_ROUNDS": config("PASSWORD_BCRYPT_ROUNDS", default=12, cast=int),
+}
+
+# The first hasher hashes new passwords, the others still verify (and upgrade) old hashes
+PASSWORD_HASHERS = [
+    "apps.core.hashers.TunedPBKDF2PasswordHasher",
+    "apps.core.hashers.TunedArgon2PasswordHasher",
+    "apps.core.hashers.TunedBCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+# Threads available to async views for password hashing
+PASSWORD_HASHING_THREADS = config("PASSWORD_HASHING_THREADS", default=4, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -236,20 +296,88 @@ MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "assets/media"
 
 STORAGES = {
+    # Uploads are content-addressed and reference-counted (see apps.common.storage)
     "default": {
-        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "BACKEND": "apps.common.storage.DeduplicatedStorage",
+        "OPTIONS": {"backend": "django.core.files.storage.FileSystemStorage"},
     },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedStaticFilesStorage",
     },
 }
 
+# Uploaded images with more pixels than this are rejected before decoding
+IMAGE_MAX_PIXELS = config("IMAGE_MAX_PIXELS", default=50_000_000, cast=int)
+
+# Profile photos are stored as uploaded and optimized by a Celery task
+PROFILE_PHOTOS = {
+    # Served while the optimized photo is pending or if processing failed
+    "PLACEHOLDER_URL": config(
+        "PROFILE_PHOTO_PLACEHOLDER_URL",
+        default="/static/images/profile-placeholder.svg",
+    ),
+    # Sizes derived from each upload. The first size in the first format is
+    # stored as profile_photo, the others next to it (see utilities.images)
+    "VARIANTS": {
+        "full": (800, 800),
+        "medium": (400, 400),
+        "thumb": (128, 128),
+    },
+    "FORMATS": ("jpeg", "webp"),
+    "QUALITY": 85,
+    # Uploads already within the first size, in the first format, upright and
+    # under this many bytes are kept as they are instead of being re-encoded
+    "AS_IS_MAX_BYTES": 300 * 1024,
+    # Bump after changing VARIANTS, FORMATS or QUALITY so reoptimize_media
+    # re-encodes photos produced by the previous settings
+    "VERSION": 1,
+}
+
+# Nearest provider search (see apps.core.services.provider)
+PROVIDER_SEARCH = {
+    "RADIUS_KM": 1,  # First search radius, doubled until enough providers are found
+    "MAX_RADIUS_KM": 50,
+}
+
+# In-process provider index used for dispatch (see apps.core.locator)
+PROVIDER_LOCATOR = {
+    "CELL_DEGREES": 0.02,  # Grid cell size, about 2.2 km
+    "START_RADIUS_KM": 1,  # First k-nearest search radius, doubled as needed
+    "SYNC_SECONDS": 5,  # How often changes by other processes are pulled
+    "SYNC_LAG_SECONDS": 120,  # Overlap between polls, covers transactions that commit late
+    "FULL_RELOAD_SECONDS": 600,  # Full reload, picks up deleted providers
+}
+
+# Provider heartbeats (see apps.core.presence)
+PROVIDER_PRESENCE = {
+    "TTL_SECONDS": 90,  # Offline after this long without a heartbeat (apps ping every 30s)
+    "REGION_PRECISION": 4,  # Geohash length of a region, about 39 x 20 km
+    "FLUSH_BATCH_SIZE": 1000,  # Rows per UPDATE when presence is written back
+}
+
+# Batch job assignment (see apps.core.services.dispatch)
+DISPATCH = {
+    "WINDOW_SECONDS": 10,  # Jobs collect this long before a batch is assigned
+    "BATCH_SIZE": 1000,  # Most jobs assigned in one batch
+    "MAX_RADIUS_KM": 15,  # Furthest a provider is sent
+    "MAX_LOAD": 3,  # Jobs a provider can have in hand
+    "RATING_WEIGHT_KM": 2,  # Extra distance accepted per star of rating
+    "LOAD_WEIGHT_KM": 3,  # Extra distance accepted per job a provider has fewer
+    "HUNGARIAN_MAX_JOBS": 300,  # Larger batches use the auction algorithm
+    "AUCTION_EPSILON_KM": 0.01,  # Auction result is within this per job of optimal
+    "MAX_DEFERRALS": 30,  # Windows a job waits for a provider before it is dropped
+    "ASSIGNMENT_TTL_SECONDS": 3600,  # A job stops counting towards its provider's load after this
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Console backend by default so the signup flow runs locally without a network
+EMAIL_BACKEND = config(
+    "EMAIL_BACKEND", default="django.core.mail.backends.console.EmailBackend"
+)
 
 # Email settings for SSL(Mainly for development and websocket_test)
 EMAIL_USE_TLS = False
@@ -266,8 +394,29 @@ EMAIL_PORT = 465
 
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Pooled mail connection used by utilities.mail.MailDispatcher
+MAIL_DISPATCHER = {
+    "BATCH_SIZE": 100,  # Messages handed to send_messages at once
+    "MAX_MESSAGES_PER_CONNECTION": 500,  # Reconnect after this many messages
+}
+
 GOOGLE_CLIENT_ID = config("GOOGLE_CLIENT_ID")
 
+# SMS gateway settings (see utilities.sms for the available backends)
+SMS_GATEWAY = {
+    "BACKEND": config("SMS_BACKEND", default="utilities.sms.ConsoleSMSBackend"),
+    "PROVIDER": config("SMS_PROVIDER", default="default"),
+    "API_URL": config("SMS_API_URL", default=""),
+    "API_KEY": config("SMS_API_KEY", default=""),
+    "SENDER_ID": "NESTWASH",
+    "FILE_PATH": None,  # Console backend appends here instead of stdout when set
+    "BATCH_SIZE": 100,  # Messages per provider API call
+    "MAX_CONCURRENCY": 4,  # Concurrent calls to the provider per process
+    "FAILURE_THRESHOLD": 5,  # Consecutive failures before the circuit opens
+    "RESET_TIMEOUT": 30,  # Seconds before a trial call is let through
+    "TIMEOUT": 10,  # Seconds per provider API call
+}
+
 # Jazzmin settings
 JAZZMIN_SETTINGS = {
     "site_brand": "NESTWASH ADMIN",
@@ -469,19 +618,24 @@ CONTENT_SECURITY_POLICY_REPORT_ONLY = {
 # CALLBACK URLS
 # REFUND_CALLBACK_URL = "https://1636-102-89-85-191.ngrok-free.app/api/v1/nestwash/refund/transaction-callback"
 
-# CELERY_BROKER_URL = "redis://localhost:6379/0"
-# CELERY_RESULT_BACKEND = CELERY_BROKER_URL
-# CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
-# CELERY_ENABLED = False
-# CELERY_TIMEZONE = "UTC"
-
-# CELERY_BEAT_SCHEDULE = {
-#     "check_event_status_and_reset": {
-#         "task": "apps.core.tasks.check_event_status_and_reset",
-#         "schedule": crontab(minute="0", hour="0"),  # Runs daily at midnight
-#     },
-#     "end_expired_wagers": {
-#         "task": "apps.event.tasks.end_expired_wagers",
-#         "schedule": crontab(minute="*/1"),  # Runs every minute
-#     },
-# }
+CELERY_BROKER_URL = config("CELERY_BROKER_URL", default="redis://localhost:6379/0")
+CELERY_RESULT_BACKEND = CELERY_BROKER_URL
+CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
+CELERY_TIMEZONE = "UTC"
+# Run tasks in-process when no broker is available locally
+CELERY_TASK_ALWAYS_EAGER = config("CELERY_TASK_ALWAYS_EAGER", default=False, cast=bool)
+
+CELERY_BEAT_SCHEDULE = {
+    "purge_expired_tokens": {
+        "task": "apps.common.tasks.purge_expired_tokens",
+        "schedule": crontab(minute="30", hour="3"),  # Runs daily at 03:30
+    },
+    "flush_provider_presence": {
+        "task": "apps.core.tasks.flush_provider_presence",
+        "schedule": 60.0,  # Runs every minute
+    },
+    "assign_pending_jobs": {
+        "task": "apps.core.tasks.assign_pending_jobs",
+        "schedule": float(DISPATCH["WINDOW_SECONDS"]),
+    },
+}
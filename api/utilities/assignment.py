@@ -0,0 +1,170 @@
+import numpy as np
+
+HUNGARIAN = "hungarian"
+AUCTION = "auction"
+
+# Above this many rows (or columns, if fewer) solve_assignment switches to
+# the auction algorithm
+HUNGARIAN_MAX_ROWS = 300
+
+
+def hungarian(cost):
+    """
+    Minimum cost assignment by the Hungarian algorithm (shortest augmenting
+    paths with potentials), vectorized over columns. O(n^2 m) for n rows and
+    m columns. Ties are broken towards the lowest column index, so the
+    result is deterministic.
+
+    :param cost: 2-D array of finite costs.
+    :return: Tuple of (row indices, column indices) of the assigned pairs,
+        sorted by row; every row is assigned when there are at least as
+        many columns as rows, and vice versa.
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.shape[0] > cost.shape[1]:
+        columns, rows = hungarian(cost.T)
+        order = np.argsort(rows)
+        return rows[order], columns[order]
+
+    n, m = cost.shape
+    if not n:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # Column j (1-based, 0 is a sentinel) is assigned to row owner[j] - 1
+    owner = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    # Start from row minima and give each row its cheapest column while it is
+    # free, so only the contested rows need an augmenting path search
+    row_potential = np.zeros(n + 1)
+    row_potential[1:] = cost.min(axis=1)
+    column_potential = np.zeros(m + 1)
+    cheapest = cost.argmin(axis=1)
+    unmatched = []
+    for row in range(1, n + 1):
+        column = cheapest[row - 1] + 1
+        if owner[column] == 0:
+            owner[column] = row
+        else:
+            unmatched.append(row)
+
+    for row in unmatched:
+        owner[0] = row
+        column = 0
+        slack = np.full(m + 1, np.inf)
+        visited = np.zeros(m + 1, dtype=bool)
+        while True:
+            visited[column] = True
+            current_row = owner[column]
+            reduced = (
+                cost[current_row - 1] - row_potential[current_row] - column_potential[1:]
+            )
+            free = ~visited[1:]
+            better = free & (reduced < slack[1:])
+            slack[1:][better] = reduced[better]
+            way[1:][better] = column
+
+            candidates = np.where(free, slack[1:], np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+
+            row_potential[owner[visited]] += delta
+            column_potential[visited] -= delta
+            slack[~visited] -= delta
+            column = next_column
+            if owner[column] == 0:
+                break
+
+        # Flip the augmenting path back to the root
+        while column:
+            previous = way[column]
+            owner[column] = owner[previous]
+            column = previous
+
+    columns = np.flatnonzero(owner[1:])
+    rows = owner[1:][columns] - 1
+    order = np.argsort(rows)
+    return rows[order], columns[order]
+
+
+def auction(cost, epsilon=None):
+    """
+    Minimum cost assignment by Bertsekas' forward auction algorithm. The
+    smaller side bids for the larger one, starting from zero prices, and
+    every unassigned bidder bids in parallel each round, which suits NumPy
+    far better than the row-by-row Hungarian method on large batches. The
+    total cost is within min(n, m) * epsilon of the optimum.
+
+    Ties are broken towards the lowest column and then the lowest row, so
+    the result is deterministic.
+
+    :param cost: 2-D array of finite costs.
+    :param epsilon: Bid increment; smaller is closer to optimal but takes
+        more rounds. Defaults to 1e-4 of the cost range.
+    :return: Tuple of (row indices, column indices) of the assigned pairs,
+        sorted by row.
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.shape[0] > cost.shape[1]:
+        columns, rows = auction(cost.T, epsilon)
+        order = np.argsort(rows)
+        return rows[order], columns[order]
+
+    n, m = cost.shape
+    if not n:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    spread = float(cost.max() - cost.min()) or 1.0
+    if epsilon is None:
+        epsilon = spread * 1e-4
+
+    benefit = -cost
+    prices = np.zeros(m)
+    owner = np.full(m, -1, dtype=np.int64)
+    assigned = np.full(n, -1, dtype=np.int64)
+    bidders = np.arange(n)
+    while len(bidders):
+        values = benefit[bidders] - prices
+        index = np.arange(len(bidders))
+        best = np.argmax(values, axis=1)
+        best_value = values[index, best]
+        if m > 1:
+            values[index, best] = -np.inf
+            second_value = values.max(axis=1)
+        else:
+            second_value = best_value - spread
+        bids = prices[best] + best_value - second_value + epsilon
+
+        # Highest bid per column wins, lowest row on ties
+        order = np.lexsort((bidders, -bids, best))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = best[order][1:] != best[order][:-1]
+        winners = bidders[order][first]
+        won = best[order][first]
+
+        prices[won] = bids[order][first]
+        outbid = owner[won]
+        assigned[outbid[outbid >= 0]] = -1
+        owner[won] = winners
+        assigned[winners] = won
+        bidders = np.flatnonzero(assigned < 0)
+
+    return np.arange(n), assigned
+
+
+def solve_assignment(cost, method=None, epsilon=None):
+    """
+    Minimum cost assignment, using the exact Hungarian algorithm for small
+    batches and the auction algorithm above HUNGARIAN_MAX_ROWS.
+
+    :param cost: 2-D array of finite costs.
+    :param method: HUNGARIAN or AUCTION to force a solver.
+    :param epsilon: Bid increment for the auction algorithm.
+    :return: Tuple of (row indices, column indices) of the assigned pairs.
+    """
+    cost = np.asarray(cost, dtype=float)
+    if method is None:
+        method = HUNGARIAN if min(cost.shape) <= HUNGARIAN_MAX_ROWS else AUCTION
+    if method == HUNGARIAN:
+        return hungarian(cost)
+    if method == AUCTION:
+        return auction(cost, epsilon)
+    raise ValueError(f"Unknown assignment method: {method}")
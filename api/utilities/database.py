@@ -0,0 +1,30 @@
+import time
+
+
+def delete_in_batches(queryset, batch_size=1000, sleep_seconds=0.0):
+    """
+    Delete the rows matched by a queryset in bounded batches, so no single
+    statement holds locks on a large table for long.
+
+    :param queryset: Queryset selecting the rows to delete.
+    :param batch_size: Maximum number of rows deleted per statement.
+    :param sleep_seconds: Pause between batches to let other writers through.
+    :return: Number of rows deleted from the queryset's table.
+    """
+    model = queryset.model
+    total_deleted = 0
+
+    while True:
+        pks = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            break
+
+        model.objects.filter(pk__in=pks).delete()
+        total_deleted += len(pks)
+
+        if len(pks) < batch_size:
+            break
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    return total_deleted
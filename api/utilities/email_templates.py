@@ -0,0 +1,84 @@
+import re
+
+from django.template import engines
+from django.template.loader import get_template
+from django.utils.html import strip_tags
+
+# Blocks whose content is not meant to be read in the plain text part
+NON_TEXT_BLOCKS = re.compile(r"<(head|style|script)\b.*?</\1>", re.IGNORECASE | re.DOTALL)
+BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+class EmailTemplate:
+    """
+    An email compiled once into HTML and plain text templates. The static parts
+    of both live in the compiled node lists, so a send only renders the
+    per-recipient context.
+    """
+
+    def __init__(self, subject, html_template_name, text_template_name=None):
+        self.subject = subject
+        self.html_template_name = html_template_name
+        self.text_template_name = text_template_name
+        self._html = None
+        self._text = None
+
+    def load(self):
+        self._html = get_template(self.html_template_name)
+        if self.text_template_name:
+            self._text = get_template(self.text_template_name)
+        else:
+            self._text = self._derive_text_template()
+
+    def _derive_text_template(self):
+        # Strip the markup from the template source once, instead of from
+        # every rendered message
+        source = self._html.template.source
+        text_source = strip_tags(NON_TEXT_BLOCKS.sub("", source))
+        text_source = BLANK_LINES.sub("\n\n", text_source)
+        return engines["django"].from_string(
+            "{% autoescape off %}" + text_source.strip() + "{% endautoescape %}"
+        )
+
+    def render(self, context):
+        if self._html is None:
+            self.load()
+        return self.subject, self._text.render(context), self._html.render(context)
+
+
+class EmailTemplateRegistry:
+    """
+    Named email templates, preloaded when a worker starts.
+    """
+
+    def __init__(self):
+        self._templates = {}
+
+    def register(self, key, subject, html_template_name, text_template_name=None):
+        self._templates[key] = EmailTemplate(
+            subject, html_template_name, text_template_name
+        )
+
+    def get(self, key):
+        """
+        :param key: Name the template was registered under.
+        :return: The registered EmailTemplate.
+        """
+        return self._templates[key]
+
+    def preload(self):
+        for template in self._templates.values():
+            template.load()
+
+    def render(self, key, context):
+        """
+        Render a registered email.
+
+        :param key: Name the template was registered under.
+        :param context: Per-recipient template context.
+        :return: Tuple of (subject, plain text body, HTML body).
+        """
+        return self.get(key).render(context)
+
+
+email_templates = EmailTemplateRegistry()
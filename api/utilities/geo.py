@@ -0,0 +1,132 @@
+import math
+
+import numpy as np
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # About 5m x 5m cells
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.32
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """
+    Encode a coordinate as a geohash. Points sharing a prefix lie in the same
+    cell, so a prefix is a range scan on an indexed geohash column.
+
+    :param latitude: Latitude in degrees.
+    :param longitude: Longitude in degrees.
+    :param precision: Number of characters.
+    :return: The geohash string.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit = value = 0
+    even = True
+    while len(chars) < precision:
+        coordinate, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        if coordinate >= middle:
+            value = (value << 1) | 1
+            bounds[0] = middle
+        else:
+            value <<= 1
+            bounds[1] = middle
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bit = value = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision):
+    """
+    :return: Tuple of (latitude degrees, longitude degrees) spanned by a cell.
+    """
+    bits = precision * 5
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Bounding box around a point, clamped to valid coordinates.
+
+    :return: Tuple of (min latitude, max latitude, min longitude, max longitude).
+    """
+    lat_delta = radius_km / KM_PER_DEGREE_LATITUDE
+    cos_latitude = max(math.cos(math.radians(latitude)), 1e-6)
+    lon_delta = min(radius_km / (KM_PER_DEGREE_LATITUDE * cos_latitude), 180.0)
+    return (
+        max(latitude - lat_delta, -90.0),
+        min(latitude + lat_delta, 90.0),
+        max(longitude - lon_delta, -180.0),
+        min(longitude + lon_delta, 180.0),
+    )
+
+
+def covering_geohashes(min_lat, max_lat, min_lon, max_lon, max_cells=16):
+    """
+    Geohash prefixes of cells that together cover a bounding box, at the
+    finest precision that needs no more than max_cells of them. Finer cells
+    hug the box more tightly, so an indexed prefix scan reads fewer rows
+    outside it.
+
+    :return: Set of geohash prefixes.
+    """
+    precision = GEOHASH_PRECISION
+    while precision > 1:
+        cell_lat, cell_lon = geohash_cell_size(precision)
+        rows = math.floor((max_lat - min_lat) / cell_lat) + 2
+        columns = math.floor((max_lon - min_lon) / cell_lon) + 2
+        if rows * columns <= max_cells:
+            break
+        precision -= 1
+    return geohashes_in_box(min_lat, max_lat, min_lon, max_lon, precision)
+
+
+def geohashes_in_box(min_lat, max_lat, min_lon, max_lon, precision):
+    """
+    Every geohash cell of the given precision that intersects a bounding box.
+
+    :return: Set of geohashes.
+    """
+    cell_lat, cell_lon = geohash_cell_size(precision)
+    latitudes = [min_lat + i * cell_lat for i in range(int((max_lat - min_lat) // cell_lat) + 1)]
+    longitudes = [min_lon + i * cell_lon for i in range(int((max_lon - min_lon) // cell_lon) + 1)]
+    return {
+        geohash_encode(latitude, longitude, precision)
+        for latitude in latitudes + [max_lat]
+        for longitude in longitudes + [max_lon]
+    }
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance between two points in kilometres.
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def haversine_km_matrix(latitudes1, longitudes1, latitudes2, longitudes2):
+    """
+    Great-circle distances in kilometres between every point of one set and
+    every point of another.
+
+    :return: Array of shape (len(latitudes1), len(latitudes2)).
+    """
+    lat1 = np.radians(np.asarray(latitudes1, dtype=float))[:, None]
+    lon1 = np.radians(np.asarray(longitudes1, dtype=float))[:, None]
+    lat2 = np.radians(np.asarray(latitudes2, dtype=float))[None, :]
+    lon2 = np.radians(np.asarray(longitudes2, dtype=float))[None, :]
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
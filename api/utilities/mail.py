@@ -0,0 +1,112 @@
+import logging
+import smtplib
+import threading
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+
+logger = logging.getLogger(__name__)
+
+
+def build_message(subject, body, to, html_message=None, from_email=None):
+    """
+    Build an email message with an optional HTML alternative.
+
+    :param subject: Subject line.
+    :param body: Plain text body.
+    :param to: List of recipient addresses.
+    :param html_message: Optional HTML body.
+    :param from_email: Sender, defaults to DEFAULT_FROM_EMAIL.
+    :return: An EmailMultiAlternatives instance.
+    """
+    message = EmailMultiAlternatives(
+        subject, body, from_email or settings.DEFAULT_FROM_EMAIL, to
+    )
+    if html_message:
+        message.attach_alternative(html_message, "text/html")
+    return message
+
+
+class MailDispatcher:
+    """
+    Keeps one long-lived mail connection per worker process and sends messages
+    through it in batches, so a queue of messages pays for one TLS handshake
+    per MAX_MESSAGES_PER_CONNECTION messages instead of one per message.
+    """
+
+    def __init__(self):
+        self._connection = None
+        self._sent_on_connection = 0
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return settings.MAIL_DISPATCHER
+
+    def send(self, messages):
+        """
+        Send messages in batches over the pooled connection.
+
+        :param messages: Iterable of EmailMessage instances.
+        :return: Number of messages sent.
+        """
+        messages = list(messages)
+        batch_size = self.config["BATCH_SIZE"]
+        sent = 0
+
+        with self._lock:
+            for start in range(0, len(messages), batch_size):
+                sent += self._send_batch(messages[start : start + batch_size])
+        return sent
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _send_batch(self, batch):
+        if self._sent_on_connection >= self.config["MAX_MESSAGES_PER_CONNECTION"]:
+            self._close()
+
+        connection = self._get_connection()
+        try:
+            sent = connection.send_messages(batch) or 0
+        except (smtplib.SMTPException, OSError):
+            # Never reuse a connection in an unknown state
+            self._close()
+            raise
+
+        self._sent_on_connection += len(batch)
+        return sent
+
+    def _get_connection(self):
+        if self._connection is not None and not self._is_alive():
+            logger.info("Mail connection dropped, reconnecting")
+            self._close()
+
+        if self._connection is None:
+            self._connection = get_connection(fail_silently=False)
+            self._connection.open()
+            self._sent_on_connection = 0
+        return self._connection
+
+    def _is_alive(self):
+        # Only the SMTP backend holds a socket that can go stale
+        smtp_connection = getattr(self._connection, "connection", None)
+        if smtp_connection is None:
+            return True
+        try:
+            return smtp_connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._connection = None
+        self._sent_on_connection = 0
+
+
+mail_dispatcher = MailDispatcher()
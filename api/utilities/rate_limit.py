@@ -0,0 +1,113 @@
+import math
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Checks every bucket first and only consumes if all of them have enough tokens,
+# so a denied request never drains the buckets it did pass.
+# KEYS: bucket keys. ARGV: cost, then capacity and refill rate per key.
+TOKEN_BUCKET_SCRIPT = """
+local cost = tonumber(ARGV[1])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local levels = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        retry_after = math.max(retry_after, (cost - tokens) / rate)
+    end
+end
+local allowed = retry_after == 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local tokens = levels[i]
+    if allowed then
+        tokens = tokens - cost
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate))
+end
+return {allowed and 1 or 0, tostring(retry_after)}
+"""
+
+
+def parse_rate(rate):
+    """
+    Parse a rate such as "5/h" into (capacity, tokens refilled per second).
+    """
+    count, period = rate.split("/")
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+class TokenBucketRateLimiter:
+    """
+    Token bucket rate limiter with O(1) state per key.
+
+    On the Redis cache the check-and-decrement runs as a single Lua script, so
+    it is atomic across workers without a lock. Other cache backends (locmem in
+    development) use a pure-Python implementation guarded by a process lock.
+    """
+
+    def __init__(self, cache_alias="default"):
+        self.cache = caches[cache_alias]
+        self._script = None
+        self._lock = threading.Lock()
+
+    def consume(self, buckets, cost=1):
+        """
+        Take `cost` tokens from every bucket, or from none of them.
+
+        :param buckets: List of (key, rate) pairs, e.g. [("phone:+234...", "5/h")].
+        :return: Tuple of (allowed, seconds until the request would be allowed).
+        """
+        buckets = [(key,) + parse_rate(rate) for key, rate in buckets]
+        if isinstance(self.cache, RedisCache):
+            return self._consume_redis(buckets, cost)
+        return self._consume_local(buckets, cost)
+
+    def _consume_redis(self, buckets, cost):
+        keys = [self.cache.make_key(key) for key, _, _ in buckets]
+        client = self.cache._cache.get_client(keys[0], write=True)
+        if self._script is None:
+            self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+        args = [cost]
+        for _, capacity, rate in buckets:
+            args.extend([capacity, rate])
+        allowed, retry_after = self._script(keys=keys, args=args, client=client)
+        return bool(allowed), float(retry_after)
+
+    def _consume_local(self, buckets, cost):
+        now = time.time()
+        with self._lock:
+            levels = []
+            retry_after = 0.0
+            for key, capacity, rate in buckets:
+                tokens, ts = self.cache.get(key) or (capacity, now)
+                tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+                levels.append(tokens)
+                if tokens < cost:
+                    retry_after = max(retry_after, (cost - tokens) / rate)
+
+            allowed = retry_after == 0
+            for (key, capacity, rate), tokens in zip(buckets, levels):
+                if allowed:
+                    tokens -= cost
+                self.cache.set(key, (tokens, now), math.ceil(capacity / rate))
+        return allowed, retry_after
+
+
+rate_limiter = TokenBucketRateLimiter()
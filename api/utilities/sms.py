@@ -0,0 +1,202 @@
+import logging
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Messages sent through the locmem backend, for tests
+outbox = []
+
+
+@dataclass
+class SMSMessage:
+    to: str
+    body: str
+
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's circuit breaker is refusing calls."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider after `failure_threshold` consecutive failures and
+    lets a single trial call through once `reset_timeout` seconds have passed.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("SMS provider circuit is open")
+            # Half-open: allow this call through, re-open on failure
+            self._opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+# Shared per provider so every backend instance in the process respects the limits
+_provider_semaphores = {}
+_provider_breakers = {}
+_provider_lock = threading.Lock()
+
+
+def _provider_guards(provider, config):
+    with _provider_lock:
+        if provider not in _provider_semaphores:
+            _provider_semaphores[provider] = threading.BoundedSemaphore(
+                config["MAX_CONCURRENCY"]
+            )
+            _provider_breakers[provider] = CircuitBreaker(
+                config["FAILURE_THRESHOLD"], config["RESET_TIMEOUT"]
+            )
+        return _provider_semaphores[provider], _provider_breakers[provider]
+
+
+class BaseSMSBackend:
+    """
+    Base class for SMS backends. Subclasses implement `send_batch`, the base
+    class handles batching, the per-provider concurrency limit and the circuit
+    breaker.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or settings.SMS_GATEWAY
+        self.provider = self.config["PROVIDER"]
+        self.semaphore, self.breaker = _provider_guards(self.provider, self.config)
+
+    def send_messages(self, messages):
+        """
+        Send messages in batches.
+
+        :param messages: Iterable of SMSMessage.
+        :return: Number of messages accepted by the provider.
+        """
+        messages = list(messages)
+        batch_size = self.config["BATCH_SIZE"]
+        sent = 0
+        for start in range(0, len(messages), batch_size):
+            sent += self._send_guarded(messages[start : start + batch_size])
+        return sent
+
+    def _send_guarded(self, batch):
+        self.breaker.before_call()
+        with self.semaphore:
+            try:
+                sent = self.send_batch(batch)
+            except Exception:
+                self.breaker.record_failure()
+                raise
+        self.breaker.record_success()
+        return sent
+
+    def send_batch(self, batch):
+        raise NotImplementedError
+
+
+class HTTPSMSBackend(BaseSMSBackend):
+    """
+    Sends batches to the provider's HTTP API over a pooled keep-alive session.
+    """
+
+    _session = None
+    _session_lock = threading.Lock()
+
+    @classmethod
+    def get_session(cls, config):
+        with cls._session_lock:
+            if cls._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=config["MAX_CONCURRENCY"]
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(
+                    {
+                        "Authorization": f"Bearer {config['API_KEY']}",
+                        "Content-Type": "application/json",
+                    }
+                )
+                cls._session = session
+            return cls._session
+
+    def send_batch(self, batch):
+        response = self.get_session(self.config).post(
+            self.config["API_URL"],
+            json={
+                "from": self.config["SENDER_ID"],
+                "messages": [
+                    {"to": message.to, "body": message.body} for message in batch
+                ],
+            },
+            timeout=self.config["TIMEOUT"],
+        )
+        response.raise_for_status()
+        return len(batch)
+
+
+class ConsoleSMSBackend(BaseSMSBackend):
+    """
+    Writes messages to stdout, or appends them to SMS_GATEWAY["FILE_PATH"] if set.
+    """
+
+    def send_batch(self, batch):
+        lines = "".join(f"SMS to {message.to}: {message.body}\n" for message in batch)
+        file_path = self.config.get("FILE_PATH")
+        if file_path:
+            with open(file_path, "a") as stream:
+                stream.write(lines)
+        else:
+            sys.stdout.write(lines)
+            sys.stdout.flush()
+        return len(batch)
+
+
+class LocMemSMSBackend(BaseSMSBackend):
+    """
+    Keeps messages in `utilities.sms.outbox`, for tests.
+    """
+
+    def send_batch(self, batch):
+        outbox.extend(batch)
+        return len(batch)
+
+
+def get_sms_backend():
+    return import_string(settings.SMS_GATEWAY["BACKEND"])()
+
+
+def send_sms(to, body):
+    """
+    Send a single SMS through the configured backend.
+
+    :param to: Recipient phone number in international format.
+    :param body: Message text.
+    :return: Number of messages sent.
+    """
+    return get_sms_backend().send_messages([SMSMessage(to=to, body=body)])